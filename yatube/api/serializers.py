@@ -0,0 +1,88 @@
+"""Ручная сериализация моделей в словари для JSON.
+
+Каждое поле — пара из функции, читающей значение, и связей, которые
+нужно подгрузить select_related. Выбранные через ?fields= поля
+определяют и ответ, и JOIN-ы запроса.
+"""
+from django.contrib.auth import get_user_model
+
+from posts.counters import get_counters
+
+User = get_user_model()
+
+
+def isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+POST_FIELDS = {
+    'id': (lambda post: post.pk, ()),
+    'text': (lambda post: post.text, ()),
+    'created': (lambda post: isoformat(post.created), ()),
+    'author': (lambda post: post.author.username, ('author',)),
+    'group': (
+        lambda post: post.group.slug if post.group_id else None, ('group',)
+    ),
+    'image': (lambda post: post.image.url if post.image else None, ()),
+    'comments_count': (lambda post: post.comments_count, ()),
+}
+# Новый комментарий меняет только поколение post:<id>, поэтому в
+# списках постов счетчика нет: иначе ETag списка отдал бы старое число.
+POST_LIST_FIELDS = {
+    name: field for name, field in POST_FIELDS.items()
+    if name != 'comments_count'
+}
+COMMENT_FIELDS = {
+    'id': (lambda comment: comment.pk, ()),
+    'post': (lambda comment: comment.post_id, ()),
+    'author': (lambda comment: comment.author.username, ('author',)),
+    'text': (lambda comment: comment.text, ()),
+    'created': (lambda comment: isoformat(comment.created), ()),
+}
+GROUP_FIELDS = {
+    'slug': (lambda group: group.slug, ()),
+    'title': (lambda group: group.title, ()),
+    'description': (lambda group: group.description, ()),
+}
+PROFILE_FIELDS = {
+    'username': (lambda user: user.username, ()),
+    'full_name': (lambda user: user.get_full_name(), ()),
+    'posts_count': (
+        lambda user: get_counters(user).posts_count, ('counters',)
+    ),
+    'followers_count': (
+        lambda user: get_counters(user).followers_count, ('counters',)
+    ),
+    'following_count': (
+        lambda user: get_counters(user).following_count, ('counters',)
+    ),
+}
+
+
+class FieldError(ValueError):
+    pass
+
+
+def select_fields(available, requested):
+    """Поля из строки вида 'id,text'; пустая строка — все поля."""
+    if not requested:
+        return list(available.items())
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise FieldError(
+            'Неизвестные поля: ' + ', '.join(unknown)
+            + '. Доступны: ' + ', '.join(available)
+        )
+    return [(name, available[name]) for name in dict.fromkeys(names)]
+
+
+def related(fields):
+    return sorted({
+        relation for _, (_, relations) in fields for relation in relations
+    })
+
+
+def serialize(objects, fields):
+    getters = [(name, getter) for name, (getter, _) in fields]
+    return [{name: get(obj) for name, get in getters} for obj in objects]
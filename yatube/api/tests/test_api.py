@@ -0,0 +1,140 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from ..serializers import POST_FIELDS, serialize
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Анна', last_name='Ахматова'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Стихи', slug='poems')
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.author, group=cls.group
+            )
+            for number in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Ответ'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_pagination(self):
+        url = reverse('api:posts')
+        response = self.client.get(url, {'limit': 2})
+        seen = []
+        while True:
+            data = response.json()
+            seen.extend(post['id'] for post in data['results'])
+            if not data['next']:
+                break
+            response = self.client.get(data['next'])
+        self.assertEqual(seen, [post.pk for post in reversed(self.posts)])
+        previous = self.client.get(data['previous']).json()
+        self.assertEqual(
+            [post['id'] for post in previous['results']], seen[2:4]
+        )
+
+    def test_sparse_fields(self):
+        response = self.client.get(
+            reverse('api:group_posts', args=['poems']),
+            {'fields': 'id,author', 'limit': 1},
+        )
+        self.assertEqual(
+            response.json()['results'],
+            [{'id': self.posts[-1].pk, 'author': 'author'}],
+        )
+        response = self.client.get(reverse('api:posts'), {'fields': 'nope'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_not_modified_without_queries(self):
+        """Повторный запрос без изменений — 304 без обращения к базе."""
+        url = reverse('api:posts')
+        response = self.client.get(url)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+            )
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(text='Новый', author=self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['text'], 'Новый')
+
+    def test_detail_endpoints(self):
+        post = self.posts[0]
+        self.assertEqual(
+            self.client.get(reverse('api:post', args=[post.pk])).json()[
+                'group'
+            ],
+            'poems',
+        )
+        comments = self.client.get(
+            reverse('api:post_comments', args=[post.pk])
+        ).json()['results']
+        self.assertEqual([c['author'] for c in comments], ['reader'])
+        profile = self.client.get(
+            reverse('api:profile', args=['author'])
+        ).json()
+        self.assertEqual(profile['full_name'], 'Анна Ахматова')
+        self.assertEqual(profile['followers_count'], 1)
+        self.assertEqual(
+            self.client.get(reverse('api:post', args=[0])).status_code, 404
+        )
+        self.assertEqual(
+            self.client.get(
+                reverse('api:post_comments', args=[0])
+            ).status_code,
+            404,
+        )
+        self.assertEqual(
+            self.client.get(reverse('api:profile', args=['nobody'])).json(),
+            {'detail': 'Пользователь не найден.'},
+        )
+
+    def test_follow_requires_login(self):
+        url = reverse('api:follow')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.reader)
+        response = self.client.get(url, {'fields': 'id'})
+        self.assertEqual(len(response.json()['results']), 5)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_serialize_page_fast(self):
+        posts = list(Post.objects.select_related('author', 'group')) * 10
+        start = time.perf_counter()
+        serialize(posts[:50], list(POST_FIELDS.items()))
+        self.assertLess(time.perf_counter() - start, 0.05)
+
+    def test_comments_count_only_in_detail(self):
+        """Комментарий не меняет ETag списка, поэтому счетчик — только
+        в ответе о посте, чье поколение комментарий сдвигает.
+        """
+        url = reverse('api:post', args=[self.posts[1].pk])
+        response = self.client.get(url)
+        self.assertEqual(response.json()['comments_count'], 0)
+        listed = self.client.get(reverse('api:posts')).json()['results']
+        self.assertNotIn('comments_count', listed[0])
+        Comment.objects.create(
+            post=self.posts[1], author=self.reader, text='Еще'
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.json()['comments_count'], 1)
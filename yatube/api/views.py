@@ -0,0 +1,192 @@
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+
+from core.conditional import conditional_on_scopes
+from posts.feed import FeedPaginator
+from posts.models import Comment, Group, Post
+from posts.paginators import KeysetPaginator
+from . import serializers
+from .serializers import (
+    COMMENT_FIELDS, GROUP_FIELDS, POST_FIELDS, POST_LIST_FIELDS,
+    PROFILE_FIELDS, FieldError,
+)
+
+User = get_user_model()
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+class ApiError(Exception):
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data, status=status, safe=False, json_dumps_params=JSON_PARAMS
+    )
+
+
+def api_view(get_scopes):
+    """GET-представление API: условный ответ по поколениям разделов,
+    ошибки — JSON с полем detail."""
+    def decorator(view):
+        conditional = conditional_on_scopes(get_scopes)(view)
+
+        @require_safe
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                return conditional(request, *args, **kwargs)
+            except ApiError as error:
+                return json_response({'detail': str(error)}, error.status)
+            except FieldError as error:
+                return json_response({'detail': str(error)}, 400)
+        return wrapper
+    return decorator
+
+
+def group_id(slug):
+    pk = Group.objects.filter(slug=slug).values_list('pk', flat=True).first()
+    if pk is None:
+        raise ApiError('Группа не найдена.', 404)
+    return pk
+
+
+def author_id(username):
+    pk = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if pk is None:
+        raise ApiError('Пользователь не найден.', 404)
+    return pk
+
+
+def login_scopes(request, *scopes):
+    if not request.user.is_authenticated:
+        raise ApiError('Требуется вход.', 401)
+    return [*scopes, f'follow:{request.user.pk}']
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', PAGE_SIZE))
+    except ValueError:
+        raise ApiError('limit должен быть числом.', 400)
+    return min(max(size, 1), MAX_PAGE_SIZE)
+
+
+def page_link(request, name, cursor):
+    if not cursor:
+        return None
+    params = request.GET.copy()
+    params.pop('after', None)
+    params.pop('before', None)
+    params[name] = cursor
+    return f'{request.path}?{params.urlencode()}'
+
+
+def paginated(request, paginator, fields):
+    page = paginator.get_page(
+        after=request.GET.get('after'), before=request.GET.get('before')
+    )
+    return json_response({
+        'results': serializers.serialize(page, fields),
+        'next': page_link(request, 'after', paginator.next_cursor),
+        'previous': page_link(request, 'before', paginator.previous_cursor),
+    })
+
+
+def post_list(request, queryset):
+    fields = serializers.select_fields(
+        POST_LIST_FIELDS, request.GET.get('fields')
+    )
+    queryset = queryset.select_related(*serializers.related(fields))
+    return paginated(
+        request, KeysetPaginator(queryset, page_size(request)), fields
+    )
+
+
+@api_view(lambda request: ['feed', 'users', 'groups'])
+def posts(request):
+    return post_list(request, Post.objects.all())
+
+
+@api_view(lambda request, post_id: [f'post:{post_id}', 'users', 'groups'])
+def post(request, post_id):
+    fields = serializers.select_fields(POST_FIELDS, request.GET.get('fields'))
+    found = Post.objects.select_related(
+        *serializers.related(fields)
+    ).filter(pk=post_id).first()
+    if found is None:
+        raise ApiError('Пост не найден.', 404)
+    return json_response(serializers.serialize([found], fields)[0])
+
+
+@api_view(lambda request, post_id: [f'post:{post_id}', 'users'])
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        raise ApiError('Пост не найден.', 404)
+    fields = serializers.select_fields(
+        COMMENT_FIELDS, request.GET.get('fields')
+    )
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        *serializers.related(fields)
+    )
+    return paginated(
+        request, KeysetPaginator(comments, page_size(request)), fields
+    )
+
+
+@api_view(lambda request: ['groups'])
+def groups(request):
+    fields = serializers.select_fields(
+        GROUP_FIELDS, request.GET.get('fields')
+    )
+    return json_response({
+        'results': serializers.serialize(
+            Group.objects.order_by('title'), fields
+        ),
+    })
+
+
+@api_view(lambda request, slug: [f'group:{group_id(slug)}', 'users'])
+def group_posts(request, slug):
+    return post_list(request, Post.objects.filter(group__slug=slug))
+
+
+@api_view(lambda request, username: [f'author:{author_id(username)}'])
+def profile(request, username):
+    fields = serializers.select_fields(
+        PROFILE_FIELDS, request.GET.get('fields')
+    )
+    user = User.objects.select_related(
+        *serializers.related(fields)
+    ).filter(username=username).first()
+    if user is None:
+        raise ApiError('Пользователь не найден.', 404)
+    return json_response(serializers.serialize([user], fields)[0])
+
+
+@api_view(
+    lambda request, username: [f'author:{author_id(username)}', 'groups']
+)
+def profile_posts(request, username):
+    return post_list(
+        request, Post.objects.filter(author__username=username)
+    )
+
+
+@api_view(lambda request: login_scopes(request, 'feed', 'users', 'groups'))
+def follow(request):
+    fields = serializers.select_fields(
+        POST_LIST_FIELDS, request.GET.get('fields')
+    )
+    return paginated(
+        request, FeedPaginator(request.user, page_size(request)), fields
+    )
@@ -1,5 +1,23 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_migrate
+
+
+def clear_caches(sender, plan=None, **kwargs):
+    """После миграций кеш не соответствует базе: данные могли поменять
+    миграции, а flush и вовсе очищает базу. Кеш общий для процессов и
+    живет в файле, поэтому сам по себе при перезапуске не очищается.
+    migrate без новых миграций (пустой plan) кеш не трогает.
+    """
+    if plan is not None and not plan:
+        return
+    for alias in settings.CACHES:
+        caches[alias].clear()
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        post_migrate.connect(clear_caches, sender=self)
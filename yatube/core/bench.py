@@ -0,0 +1,55 @@
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment, teardown_test_environment,
+)
+
+
+@contextmanager
+def benchmark_database():
+    """Временная база для замеров: рабочие данные не затрагиваются."""
+    from posts.visitors import visitor_buffer
+
+    directory = tempfile.mkdtemp(prefix='yatube-bench-')
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    test_settings['NAME'] = os.path.join(directory, 'bench.sqlite3')
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    try:
+        yield
+    finally:
+        # Буфер посетителей сбрасывается в эту же базу, иначе сброс при
+        # выходе пойдет в уже удаленную.
+        try:
+            visitor_buffer.flush()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def measure(func, repeat):
+    """Вызывает func repeat раз, возвращает времена в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summary(timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return (
+        f'mean {statistics.mean(timings):.2f} ms, '
+        f'p50 {statistics.median(timings):.2f} ms, p95 {p95:.2f} ms'
+    )
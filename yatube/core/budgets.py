@@ -0,0 +1,42 @@
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def duplicated_queries(queries):
+    """Возвращает повторяющиеся запросы: (число повторов, SQL)."""
+    counts = Counter(query['sql'] for query in queries)
+    return [(number, sql) for sql, number in counts.most_common()
+            if number > 1]
+
+
+def budget_report(name, queries, max_queries, max_time):
+    total = sum(float(query['time']) for query in queries) * 1000
+    lines = [
+        f'{name}: запросов {len(queries)} (бюджет {max_queries}), '
+        f'время в базе {total:.1f} мс (бюджет {max_time} мс)'
+    ]
+    duplicates = duplicated_queries(queries)
+    if duplicates:
+        lines.append('Повторяющиеся запросы:')
+        lines.extend(f'  {number} x {sql}' for number, sql in duplicates)
+    return '\n'.join(lines)
+
+
+class QueryBudgetMixin:
+    """Проверки бюджета запросов к базе для тестов Django."""
+
+    @contextmanager
+    def assertQueryBudget(self, name, max_queries, max_time):
+        """Падает, если блок сделал больше запросов или дольше ждал базу.
+
+        В сообщении печатается повторяющийся SQL — обычно это N+1.
+        """
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        queries = context.captured_queries
+        total = sum(float(query['time']) for query in queries) * 1000
+        if len(queries) > max_queries or total > max_time:
+            self.fail(budget_report(name, queries, max_queries, max_time))
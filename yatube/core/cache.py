@@ -0,0 +1,238 @@
+import hashlib
+import math
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+
+from . import metrics
+from .timing import count_cache
+
+GENERATION_PREFIX = 'generation:'
+MODIFIED_PREFIX = 'modified:'
+LOCK_PREFIX = 'lock:'
+# Как часто SQLite проверяет срок во время запроса, в инструкциях VM.
+DEADLINE_CHECK_STEPS = 10000
+
+
+def get_generations(names):
+    """Возвращает текущие номера поколений для списка имен.
+
+    Отсутствующий счетчик заводится от текущего времени, а не с единицы:
+    после вытеснения из кеша старые страницы не оживут.
+    """
+    keys = [GENERATION_PREFIX + name for name in names]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def bump_generations(*names):
+    for name in names:
+        key = GENERATION_PREFIX + name
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+    now = int(time.time())
+    cache.set_many({MODIFIED_PREFIX + name: now for name in names}, None)
+
+
+def bump_on_commit(*names):
+    """Увеличивает поколения сразу и еще раз после фиксации транзакции.
+
+    Запрос, пришедший до фиксации, построит страницу из старых данных
+    и сохранит ее под промежуточным поколением; без второго увеличения
+    такая страница уже не устарела бы. Первое нужно самой транзакции:
+    ее чтения не должны брать страницы, построенные до изменения.
+    """
+    bump_generations(*names)
+    transaction.on_commit(lambda: bump_generations(*names))
+
+
+def get_modified(names):
+    """Время последнего изменения разделов в секундах.
+
+    Неизвестное время считается текущим: клиент получит страницу
+    целиком, но никогда — устаревшую.
+    """
+    keys = [MODIFIED_PREFIX + name for name in names]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        now = int(time.time())
+        for key in missing:
+            cache.add(key, now, None)
+        found.update(cache.get_many(missing))
+    return max(found.values(), default=int(time.time()))
+
+
+@contextmanager
+def query_deadline(seconds):
+    """Прерывает запросы SQLite, которые идут дольше seconds: запрос
+    падает с OperationalError. На других базах ничего не делает.
+    """
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    connection.ensure_connection()
+    deadline = time.monotonic() + seconds
+    connection.connection.set_progress_handler(
+        lambda: time.monotonic() > deadline, DEADLINE_CHECK_STEPS
+    )
+    try:
+        yield
+    finally:
+        connection.connection.set_progress_handler(None, 0)
+
+
+def expires_early(entry, now, beta):
+    """XFetch: чем дороже пересчет и ближе срок, тем вероятнее, что
+    запрос пересчитает значение раньше срока — и только один.
+    """
+    if entry['expires'] is None:
+        return False
+    jitter = -entry['delta'] * beta * math.log(1.0 - random.random())
+    return now + jitter >= entry['expires']
+
+
+def get_or_refresh(key, compute, timeout=None, version=None,
+                   should_cache=None, layer=None, backend=None):
+    """Значение из кеша с защитой от одновременного пересчета.
+
+    Запись годна, пока не истек timeout (None — бессрочно) и не
+    изменилась version. Устаревшую запись пересчитывает один запрос,
+    взявший блокировку через add; остальные тем временем получают
+    старое значение. Если старого нет, они ждут нового не дольше
+    CACHE_REFRESH_DEADLINE и затем считают сами. Пересчет со старым
+    значением в запасе ограничен тем же сроком: заблокированная или
+    медленная база отдает старое. should_cache(value) отбирает
+    значения для записи, layer — имя слоя в метриках кеша. Годится
+    любой бэкенд CACHES с атомарным add.
+    """
+    backend = cache if backend is None else backend
+    entry = backend.get(key)
+    if entry is not None and entry['version'] == version and not (
+        expires_early(entry, time.time(), settings.CACHE_XFETCH_BETA)
+    ):
+        if layer:
+            count_cache(layer, hits=1)
+        return entry['value']
+    if layer:
+        count_cache(layer, misses=1)
+    lock = LOCK_PREFIX + key
+    locked = backend.add(lock, 1, settings.CACHE_LOCK_TIMEOUT)
+    if not locked:
+        entry = stale_or_wait(backend, key, entry, layer)
+        if entry is not None:
+            return entry['value']
+    try:
+        start = time.monotonic()
+        value, computed = compute_with_deadline(compute, entry, layer)
+        if computed and (should_cache is None or should_cache(value)):
+            store_entry(
+                backend, key, value, version, timeout,
+                time.monotonic() - start,
+            )
+        return value
+    finally:
+        if locked:
+            backend.delete(lock)
+
+
+def stale_or_wait(backend, key, entry, layer):
+    """Запись для запроса, не взявшего блокировку: старая, если есть,
+    иначе новая от пересчитывающего; None — считать самому.
+    """
+    if entry is not None:
+        count_stale(layer)
+        return entry
+    return wait_for_entry(backend, key)
+
+
+def compute_with_deadline(compute, entry, layer):
+    """Возвращает значение и признак того, что оно пересчитано. Без
+    старой записи ждать нечего, и пересчет идет без срока.
+    """
+    if entry is None:
+        return compute(), True
+    try:
+        with query_deadline(settings.CACHE_REFRESH_DEADLINE):
+            return compute(), True
+    except OperationalError:
+        count_stale(layer)
+        return entry['value'], False
+
+
+def store_entry(backend, key, value, version, timeout, delta):
+    if timeout is None:
+        expires = stored = None
+    else:
+        expires = time.time() + timeout
+        stored = timeout + settings.CACHE_STALE_TIMEOUT
+    backend.set(key, {
+        'value': value,
+        'version': version,
+        'delta': delta,
+        'expires': expires,
+    }, stored)
+
+
+def count_stale(layer):
+    if layer:
+        metrics.cache_requests.inc(layer, 'stale')
+
+
+def wait_for_entry(backend, key):
+    deadline = time.monotonic() + settings.CACHE_REFRESH_DEADLINE
+    while time.monotonic() < deadline:
+        time.sleep(0.01)
+        entry = backend.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def cache_versioned_page(get_scopes, timeout=None):
+    """Кеширует GET-ответ под ключом с поколениями его разделов.
+
+    get_scopes(request, *args, **kwargs) возвращает имена поколений,
+    от которых зависит страница. Изменение данных увеличивает поколение,
+    и следующий запрос строит страницу заново, поэтому хранить ответ
+    можно сколь угодно долго; пока один запрос строит новую страницу,
+    остальные получают прежнюю (get_or_refresh). Персональные части
+    страницы — дыры core.pagecache, так что копия общая для всех
+    пользователей. Ответ помечается разделами и поколениями, из которых
+    он построен, для анонимного кеша страниц и ETag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+            scopes = get_scopes(request, *args, **kwargs)
+            generations = get_generations(scopes)
+            raw_key = '|'.join(map(str, (
+                request.get_host(), request.get_full_path(), args,
+                sorted(kwargs.items()),
+            )))
+            response, built = get_or_refresh(
+                'page:' + hashlib.md5(raw_key.encode()).hexdigest(),
+                lambda: (view(request, *args, **kwargs), generations),
+                settings.PAGE_CACHE_TIMEOUT if timeout is None else timeout,
+                version=generations,
+                should_cache=lambda value: value[0].status_code == 200,
+                layer='page',
+            )
+            response.page_scopes = scopes
+            response.page_generations = built
+            return response
+        return wrapper
+    return decorator
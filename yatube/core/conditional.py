@@ -0,0 +1,66 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .cache import get_generations, get_modified
+from .pagecache import holes as hole_renderers
+
+
+def conditional_on_scopes(get_scopes, holes=()):
+    """Отвечает 304 по ETag и Last-Modified, не вызывая представление.
+
+    get_scopes(request, *args, **kwargs) возвращает имена поколений,
+    от которых зависит ответ, или None, если проверить нечего. ETag
+    строится из адреса, аргументов, номеров поколений и всего, что
+    страница показывает конкретному пользователю: имени в шапке и
+    CSRF-cookie, от которой зависят токены форм. Значения поздних дыр
+    из holes, которые заполняются при каждой отдаче и поколениями не
+    отслеживаются, тоже входят в ETag. Last-Modified — время
+    последнего изменения разделов. Обе проверки обходятся кешем, а
+    ответ помечается no-cache, чтобы браузер всегда его перепроверял.
+    Устаревшая копия, отданная на время пересчета, ETag не получает.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            scopes = get_scopes(request, *args, **kwargs)
+            if scopes is None:
+                return view(request, *args, **kwargs)
+            generations = get_generations(scopes)
+            raw = '|'.join(map(str, (
+                request.get_host(),
+                request.get_full_path(),
+                args,
+                sorted(kwargs.items()),
+                request.user.pk,
+                request.user.get_username(),
+                request.COOKIES.get(settings.CSRF_COOKIE_NAME),
+                generations,
+                [hole_renderers[name](request, '') for name in holes],
+            )))
+            etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+            last_modified = get_modified(scopes)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+            stale = getattr(
+                response, 'page_generations', generations
+            ) != generations
+            if response.status_code in (200, 304) and not stale:
+                response['ETag'] = etag
+                response['Last-Modified'] = http_date(last_modified)
+                patch_cache_control(
+                    response,
+                    no_cache=True,
+                    private=request.user.is_authenticated,
+                )
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,314 @@
+import fcntl
+import functools
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+HEADER = struct.Struct('<I')
+ENTRY = struct.Struct('<I')
+VALUE = struct.Struct('<d')
+INITIAL_SIZE = 64 * 1024
+MERGED = 'merged.db'
+
+
+def _padded(length):
+    return (length + 7) // 8 * 8
+
+
+class MmapValues:
+    """Файл процесса со значениями метрик: ключ -> float.
+
+    Запись: длина ключа, ключ (выровнен до 8 байт), значение. В заголовке
+    хранится занятый объем; он увеличивается только после записи
+    значения, поэтому читатель из другого процесса видит лишь целые
+    записи. Пишет в файл только процесс-владелец.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.positions = {}
+        self.file = open(path, 'a+b')
+        if os.fstat(self.file.fileno()).st_size == 0:
+            self.file.truncate(INITIAL_SIZE)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.used = HEADER.unpack_from(self.map, 0)[0] or HEADER.size
+        for key, _, position in read_entries(self.map, self.used):
+            self.positions[key] = position
+
+    def _grow(self, needed):
+        size = len(self.map)
+        while size < needed:
+            size *= 2
+        self.map.close()
+        self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+
+    def _position(self, key):
+        position = self.positions.get(key)
+        if position is None:
+            encoded = key.encode()
+            entry = ENTRY.size + _padded(len(encoded)) + VALUE.size
+            self._grow(self.used + entry)
+            ENTRY.pack_into(self.map, self.used, len(encoded))
+            self.map[
+                self.used + ENTRY.size:self.used + ENTRY.size + len(encoded)
+            ] = encoded
+            position = self.used + ENTRY.size + _padded(len(encoded))
+            VALUE.pack_into(self.map, position, 0.0)
+            self.used += entry
+            HEADER.pack_into(self.map, 0, self.used)
+            self.positions[key] = position
+        return position
+
+    def add(self, key, amount):
+        position = self._position(key)
+        value = VALUE.unpack_from(self.map, position)[0]
+        VALUE.pack_into(self.map, position, value + amount)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def read_entries(buffer, used):
+    offset = HEADER.size
+    while offset < used:
+        length = ENTRY.unpack_from(buffer, offset)[0]
+        start = offset + ENTRY.size
+        key = bytes(buffer[start:start + length]).decode()
+        position = start + _padded(length)
+        yield key, VALUE.unpack_from(buffer, position)[0], position
+        offset = position + VALUE.size
+
+
+def read_file(path):
+    with open(path, 'rb') as file:
+        data = file.read()
+    if len(data) < HEADER.size:
+        return
+    used = min(HEADER.unpack_from(data, 0)[0], len(data))
+    for key, value, _ in read_entries(data, used):
+        yield key, value
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def merge_dead(directory):
+    """Переносит значения завершившихся процессов в общий файл.
+
+    Иначе файлы перезапущенных воркеров копятся в каталоге без предела.
+    Счетчики при этом не уменьшаются. Слияние идет под блокировкой
+    каталога, чтобы два процесса не перенесли один файл дважды.
+    """
+    with open(os.path.join(directory, '.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        dead = [
+            filename for filename in os.listdir(directory)
+            if filename.endswith('.db') and filename[:-3].isdigit()
+            and not is_alive(int(filename[:-3]))
+        ]
+        if not dead:
+            return
+        merged = MmapValues(os.path.join(directory, MERGED))
+        try:
+            for filename in dead:
+                path = os.path.join(directory, filename)
+                for key, value in read_file(path):
+                    merged.add(key, value)
+                os.remove(path)
+        finally:
+            merged.close()
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', r'\\').replace('"', r'\"'),
+        )
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+@functools.lru_cache(maxsize=4096)
+def sample_key(name, labels):
+    return json.dumps([name, [list(pair) for pair in labels]])
+
+
+class Registry:
+    """Метрики всех процессов. Каждый процесс пишет свой файл в
+    METRICS_DIR, выдача суммирует значения из всех файлов каталога;
+    файлы завершившихся процессов сливаются в MERGED.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.values = None
+        self.owner = None
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def _values(self):
+        owner = (os.getpid(), settings.METRICS_DIR)
+        if self.owner != owner:
+            os.makedirs(settings.METRICS_DIR, exist_ok=True)
+            self.values = MmapValues(
+                os.path.join(settings.METRICS_DIR, f'{owner[0]}.db')
+            )
+            self.owner = owner
+        return self.values
+
+    def add(self, *samples):
+        """Прибавляет значения к образцам (имя, метки, приращение)."""
+        with self.lock:
+            values = self._values()
+            for name, labels, amount in samples:
+                values.add(sample_key(name, labels), amount)
+
+    def collect(self):
+        """Суммы по всем процессам: {имя: {метки: значение}}."""
+        totals = defaultdict(lambda: defaultdict(float))
+        directory = settings.METRICS_DIR
+        if os.path.isdir(directory):
+            merge_dead(directory)
+            for filename in os.listdir(directory):
+                if not filename.endswith('.db'):
+                    continue
+                for key, value in read_file(
+                    os.path.join(directory, filename)
+                ):
+                    name, labels = json.loads(key)
+                    totals[name][tuple(map(tuple, labels))] += value
+        return totals
+
+    def render(self):
+        """Текстовый формат экспозиции Prometheus."""
+        totals = self.collect()
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples(totals))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def inc(self, *labels, amount=1):
+        pairs = tuple(zip(self.labelnames, map(str, labels)))
+        registry.add((self.name, pairs, amount))
+
+    def samples(self, totals):
+        for labels, value in sorted(totals[self.name].items()):
+            yield f'{self.name}{format_labels(labels)} {value:g}'
+
+
+def format_bound(bound):
+    return '+Inf' if bound == float('inf') else f'{bound:g}'
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин.
+
+    В файлах хранятся некумулятивные счетчики корзин, при выдаче они
+    накапливаются, как требует формат.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        registry.register(self)
+
+    def observe(self, value, *labels):
+        pairs = tuple(zip(self.labelnames, map(str, labels)))
+        bound = next(bound for bound in self.buckets if value <= bound)
+        bucket = pairs + (('le', format_bound(bound)),)
+        registry.add(
+            (f'{self.name}_bucket', bucket, 1),
+            (f'{self.name}_sum', pairs, value),
+            (f'{self.name}_count', pairs, 1),
+        )
+
+    def samples(self, totals):
+        buckets = defaultdict(dict)
+        for labels, value in totals[f'{self.name}_bucket'].items():
+            buckets[labels[:-1]][labels[-1][1]] = value
+        for labels in sorted(totals[f'{self.name}_count']):
+            cumulative = 0
+            for bound in map(format_bound, self.buckets):
+                cumulative += buckets[labels].get(bound, 0)
+                yield '{}_bucket{} {:g}'.format(
+                    self.name,
+                    format_labels(labels + (('le', bound),)),
+                    cumulative,
+                )
+            for suffix in ('_sum', '_count'):
+                yield '{}{}{} {:g}'.format(
+                    self.name, suffix, format_labels(labels),
+                    totals[self.name + suffix][labels],
+                )
+
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+
+request_latency = Histogram(
+    'yatube_request_duration_seconds',
+    'Время обработки запроса.',
+    ['view'],
+    LATENCY_BUCKETS,
+)
+responses = Counter(
+    'yatube_responses_total', 'Ответы по кодам статуса.', ['view', 'status']
+)
+request_queries = Histogram(
+    'yatube_request_queries',
+    'Число SQL-запросов на запрос.',
+    ['view'],
+    (0, 1, 2, 5, 10, 20, 50, 100),
+)
+cache_requests = Counter(
+    'yatube_cache_requests_total',
+    'Обращения к кешу страниц и фрагментов.',
+    ['layer', 'result'],
+)
+thumbnail_latency = Histogram(
+    'yatube_thumbnail_duration_seconds',
+    'Время генерации миниатюры.',
+    (),
+    LATENCY_BUCKETS,
+)
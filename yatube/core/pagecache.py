@@ -0,0 +1,144 @@
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.dispatch import Signal
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.urls import resolve
+
+from .cache import get_generations
+from .timing import count_cache
+
+HOLE = re.compile(r'<!--hole:(\w+):([^>]*?)-->')
+holes = {}
+# Поздние дыры заполняются при каждой отдаче страницы, остальные у
+# анонимной копии — один раз, при сохранении в кеш.
+late_holes = set()
+page_cache_hit = Signal(providing_args=['request'])
+
+
+def register_hole(name, late=False):
+    """Регистрирует отрисовку дыры: функцию (request, arg) -> str."""
+    def decorator(render):
+        holes[name] = render
+        if late:
+            late_holes.add(name)
+        return render
+    return decorator
+
+
+def hole_marker(name, arg=''):
+    return f'<!--hole:{name}:{arg}-->'
+
+
+def fill_holes(request, content, only=None):
+    """Подставляет в HTML отрисованные дыры; одинаковые — один раз."""
+    rendered = {}
+
+    def render(match):
+        if only is not None and match[1] not in only:
+            return match[0]
+        if match[0] not in rendered:
+            rendered[match[0]] = holes[match[1]](request, match[2])
+        return rendered[match[0]]
+
+    return HOLE.sub(render, content)
+
+
+@register_hole('header')
+def header(request, arg):
+    return render_to_string('includes/header.html', request=request)
+
+
+def set_content(response, content):
+    response.content = content
+    if response.has_header('Content-Length'):
+        response['Content-Length'] = str(len(response.content))
+
+
+def page_key(request):
+    raw = request.get_host() + request.get_full_path()
+    return 'anonymous_page:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+class PageCacheMiddleware:
+    """Кеш целых страниц для анонимов и заполнение дыр для всех.
+
+    Страницы, которые пометил cache_versioned_page, рендерятся без
+    персональных частей: на их месте маркеры дыр. Анонимный GET без
+    cookie сессии и условных заголовков отдается из кеша раньше сессий,
+    аутентификации и CSRF; копия годна, пока не изменились поколения
+    ее разделов. Остальным страница собирается из общего тела и дыр,
+    отрисованных для текущего пользователя.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        key = page_key(request) if self.is_anonymous(request) else None
+        if key is not None:
+            entry = cache.get(key)
+            if entry is not None and (
+                get_generations(entry['scopes']) == entry['generations']
+            ):
+                count_cache('anonymous_page', hits=1)
+                request.resolver_match = resolve(request.path_info)
+                page_cache_hit.send(sender=self.__class__, request=request)
+                response = HttpResponse(
+                    fill_holes(request, entry['content'])
+                )
+                for header, value in entry['headers']:
+                    response[header] = value
+                response['Content-Length'] = str(len(response.content))
+                return response
+            count_cache('anonymous_page', misses=1)
+        response = self.get_response(request)
+        if not self.has_holes(response):
+            return response
+        content = response.content.decode(response.charset)
+        if key is not None and self.is_shareable(request, response):
+            set_content(response, fill_holes(
+                request, content, only=set(holes) - late_holes
+            ))
+            content = response.content.decode(response.charset)
+            cache.set(key, {
+                'scopes': response.page_scopes,
+                'generations': response.page_generations,
+                'content': content,
+                'headers': [
+                    (header, value) for header, value in response.items()
+                    if header not in ('Content-Length', 'Server-Timing')
+                ],
+            }, settings.PAGE_CACHE_TIMEOUT)
+        set_content(response, fill_holes(request, content))
+        return response
+
+    @staticmethod
+    def is_anonymous(request):
+        return (
+            request.method == 'GET'
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+            and 'HTTP_IF_NONE_MATCH' not in request.META
+            and 'HTTP_IF_MODIFIED_SINCE' not in request.META
+        )
+
+    @staticmethod
+    def has_holes(response):
+        return (
+            not response.streaming
+            and response.get('Content-Type', '').startswith('text/html')
+            and b'<!--hole:' in response.content
+        )
+
+    @staticmethod
+    def is_shareable(request, response):
+        return (
+            response.status_code == 200
+            and hasattr(response, 'page_scopes')
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_USED')
+            and not request.user.is_authenticated
+        )
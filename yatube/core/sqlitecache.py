@@ -0,0 +1,237 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'PRAGMA journal_mode = WAL',
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, '
+    'size INTEGER NOT NULL, accessed REAL NOT NULL) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE TABLE IF NOT EXISTS cache_size ('
+    'id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)',
+    'INSERT OR IGNORE INTO cache_size VALUES (0, 0)',
+    'CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache '
+    'BEGIN UPDATE cache_size SET total = total + new.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache '
+    'BEGIN UPDATE cache_size SET total = total - old.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_update '
+    'AFTER UPDATE OF size ON cache BEGIN '
+    'UPDATE cache_size SET total = total - old.size + new.size; END',
+)
+UPSERT = (
+    'INSERT INTO cache (key, value, expires, size, accessed) '
+    'VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+    'value = excluded.value, expires = excluded.expires, '
+    'size = excluded.size, accessed = excluded.accessed'
+)
+LIVE = '(expires IS NULL OR expires > ?)'
+# Время последнего чтения обновляется не чаще раза в секунду на ключ:
+# LRU приблизительный, зато горячие ключи не пишут в базу на каждый get.
+ACCESS_RESOLUTION = 1.0
+# Вытеснение освобождает место с запасом, а не под одну запись.
+CULL_TARGET = 0.9
+# Накладные расходы строки в байтах сверх ключа и значения.
+ROW_OVERHEAD = 32
+# UPDATE ... RETURNING появился в SQLite 3.35; на старых версиях incr
+# идет через транзакцию с чтением.
+RETURNING = sqlite3.sqlite_version_info >= (3, 35)
+
+
+def encode(value):
+    """Целые хранятся как INTEGER, чтобы incr шел одним UPDATE."""
+    if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+        return value
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def decode(value):
+    if isinstance(value, int):
+        return value
+    return pickle.loads(value)
+
+
+def row_size(key, value):
+    return len(key) + (8 if isinstance(value, int) else len(value)) + (
+        ROW_OVERHEAD
+    )
+
+
+class SQLiteCache(BaseCache):
+    """Общий для процессов кеш в файле SQLite в режиме WAL.
+
+    LOCATION — путь к файлу. Читатели не блокируют друг друга и
+    писателя, запись сериализует сама SQLite, поэтому add и incr
+    атомарны между процессами. OPTIONS['MAX_SIZE'] ограничивает объем
+    в байтах: при превышении сначала удаляются просроченные записи,
+    затем давно не читанные. Соединение свое у каждого потока и
+    процесса: после fork дочерний процесс открывает файл заново.
+    Нужна SQLite 3.25 и новее: UPSERT и оконные функции.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = os.path.abspath(location)
+        self.max_size = int(options.get('MAX_SIZE', 64 * 2 ** 20))
+        self.busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+
+    @property
+    def db(self):
+        local = self._local
+        if getattr(local, 'owner', None) != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(
+                self.path, timeout=self.busy_timeout, isolation_level=None
+            )
+            db.execute('PRAGMA synchronous = NORMAL')
+            db.execute('PRAGMA mmap_size = %d' % self.max_size)
+            for statement in SCHEMA:
+                db.execute(statement)
+            local.db, local.owner = db, os.getpid()
+        return local.db
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _row(self, key, value, timeout, now):
+        encoded = encode(value)
+        return (
+            key, encoded, self.get_backend_timeout(timeout),
+            row_size(key, encoded), now,
+        )
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        now = time.time()
+        rows = self.db.execute(
+            'SELECT key, value, accessed FROM cache WHERE key IN (%s) '
+            'AND %s' % (', '.join('?' * len(keys)), LIVE),
+            [*keys, now],
+        ).fetchall()
+        stale = [key for key, _, accessed in rows
+                 if accessed < now - ACCESS_RESOLUTION]
+        if stale:
+            self.db.execute(
+                'UPDATE cache SET accessed = ? WHERE key IN (%s)'
+                % ', '.join('?' * len(stale)),
+                [now, *stale],
+            )
+        return {keys[key]: decode(value) for key, value, _ in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        rows = [
+            self._row(self._key(key, version), value, timeout, now)
+            for key, value in data.items()
+        ]
+        with self.db as db:
+            db.execute('BEGIN IMMEDIATE')
+            db.executemany(UPSERT, rows)
+        self._cull()
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        added = self.db.execute(
+            UPSERT + ' WHERE NOT (cache.expires IS NULL '
+            'OR cache.expires > ?)',
+            [*self._row(self._key(key, version), value, timeout, now), now],
+        ).rowcount == 1
+        if added:
+            self._cull()
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        name, key = key, self._key(key, version)
+        now = time.time()
+        if RETURNING:
+            row = self.db.execute(
+                'UPDATE cache SET value = value + ?, accessed = ? '
+                "WHERE key = ? AND typeof(value) = 'integer' AND %s "
+                'RETURNING value' % LIVE,
+                [delta, now, key, now],
+            ).fetchall()
+            if row:
+                return row[0][0]
+        with self.db as db:
+            db.execute('BEGIN IMMEDIATE')
+            row = db.execute(
+                'SELECT value FROM cache WHERE key = ? AND %s' % LIVE,
+                [key, now],
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % name)
+            value = decode(row[0]) + delta
+            encoded = encode(value)
+            db.execute(
+                'UPDATE cache SET value = ?, size = ?, accessed = ? '
+                'WHERE key = ?',
+                [encoded, row_size(key, encoded), now, key],
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.db.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? AND %s' % LIVE,
+            [self.get_backend_timeout(timeout), self._key(key, version),
+             time.time()],
+        ).rowcount == 1
+
+    def has_key(self, key, version=None):
+        return self.db.execute(
+            'SELECT 1 FROM cache WHERE key = ? AND %s' % LIVE,
+            [self._key(key, version), time.time()],
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self.db.execute(
+                'DELETE FROM cache WHERE key IN (%s)'
+                % ', '.join('?' * len(keys)),
+                keys,
+            )
+
+    def clear(self):
+        self.db.execute('DELETE FROM cache')
+
+    def size(self):
+        return self.db.execute('SELECT total FROM cache_size').fetchone()[0]
+
+    def _cull(self):
+        """Освобождает место до CULL_TARGET от MAX_SIZE: сначала
+        просроченные записи, затем по давности чтения.
+        """
+        if self.size() <= self.max_size:
+            return
+        with self.db as db:
+            db.execute('BEGIN IMMEDIATE')
+            db.execute('DELETE FROM cache WHERE NOT %s' % LIVE, [time.time()])
+            excess = self.size() - int(self.max_size * CULL_TARGET)
+            if excess > 0:
+                db.execute(
+                    'DELETE FROM cache WHERE key IN ('
+                    'SELECT key FROM (SELECT key, size, sum(size) OVER '
+                    '(ORDER BY accessed, key) AS freed FROM cache) '
+                    'WHERE freed - size < ?)',
+                    [excess],
+                )
@@ -0,0 +1,12 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core.pagecache import hole_marker
+
+register = template.Library()
+
+
+@register.simple_tag
+def hole(name, arg=''):
+    """Место для персональной части страницы, см. core.pagecache."""
+    return mark_safe(hole_marker(name, arg))
@@ -0,0 +1,120 @@
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+from django.template.base import Template
+
+from . import metrics
+
+logger = logging.getLogger('yatube.timing')
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Счетчики одного запроса: SQL, шаблоны, кеш."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.queries += 1
+
+
+def count_cache(layer, hits=0, misses=0):
+    """Учитывает попадания и промахи кеша в текущем запросе."""
+    if hits:
+        metrics.cache_requests.inc(layer, 'hit', amount=hits)
+    if misses:
+        metrics.cache_requests.inc(layer, 'miss', amount=misses)
+    timings = _current.get()
+    if timings is not None:
+        timings.cache_hits += hits
+        timings.cache_misses += misses
+
+
+_template_render = Template.render
+
+
+def _timed_render(self, context):
+    timings = _current.get()
+    if timings is None or timings.template_depth:
+        return _template_render(self, context)
+    # Вложенные include считаются внутри внешнего шаблона.
+    timings.template_depth += 1
+    start = time.perf_counter()
+    try:
+        return _template_render(self, context)
+    finally:
+        timings.template_time += time.perf_counter() - start
+        timings.template_depth -= 1
+
+
+Template.render = _timed_render
+
+
+def server_timing(timings, total):
+    return ', '.join((
+        f'db;dur={timings.sql_time * 1000:.1f};'
+        f'desc="{timings.queries} queries"',
+        f'tpl;dur={timings.template_time * 1000:.1f}',
+        f'cache;desc="hits={timings.cache_hits} '
+        f'misses={timings.cache_misses}"',
+        f'total;dur={total * 1000:.1f}',
+    ))
+
+
+class ServerTimingMiddleware:
+    """Замеряет каждый запрос для метрик процесса. Для доли запросов
+    TIMING_SAMPLE_RATE итог дополнительно отдается в Server-Timing
+    и в лог одной строкой JSON.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(timings):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - start
+        match = request.resolver_match
+        view = match.view_name if match else None
+        metrics.request_latency.observe(total, view)
+        metrics.request_queries.observe(timings.queries, view)
+        metrics.responses.inc(view, response.status_code)
+        if random.random() >= settings.TIMING_SAMPLE_RATE:
+            return response
+        response['Server-Timing'] = server_timing(timings, total)
+        logger.info(json.dumps({
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': timings.queries,
+            'sql_ms': round(timings.sql_time * 1000, 2),
+            'template_ms': round(timings.template_time * 1000, 2),
+            'cache_hits': timings.cache_hits,
+            'cache_misses': timings.cache_misses,
+            'total_ms': round(total * 1000, 2),
+        }))
+        return response
@@ -1,7 +1,11 @@
 from http import HTTPStatus
 
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
 from django.shortcuts import render
 
+from .metrics import registry
+
 
 def page_not_found(request, exception):
     return render(
@@ -19,3 +23,10 @@ def internal_server_error(request):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html', status=HTTPStatus.FORBIDDEN)
+
+
+@staff_member_required
+def metrics(request):
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
@@ -1,9 +1,17 @@
 from django.contrib import admin
 
+from . import search
 from .models import Post, Group, Comment, Follow, Visitor, Setting
+from .paginators import CappedCountPaginator
 
 
-class PostAdmin(admin.ModelAdmin):
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список без полного COUNT(*) по таблице."""
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+
+
+class PostAdmin(LargeTableAdmin):
     list_display = (
         'pk',
         'text',
@@ -12,14 +20,64 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('created',)
+    date_hierarchy = 'created'
+    autocomplete_fields = ('author',)
     empty_value_display = '-пусто-'
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        """Группы для list_editable выбираются один раз на запрос,
+        а не для каждой строки списка."""
+        formfield = super().formfield_for_foreignkey(
+            db_field, request, **kwargs
+        )
+        if db_field.name == 'group':
+            choices = getattr(request, '_group_choices', None)
+            if choices is None:
+                choices = request._group_choices = list(formfield.choices)
+            formfield.choices = choices
+        return formfield
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по тексту через полнотекстовый индекс вместо LIKE."""
+        if not search.available() or not search.match_query(search_term):
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        ids = search.matching_ids(search_term)
+        return queryset.filter(id__in=ids), False
+
+
+class CommentAdmin(LargeTableAdmin):
+    list_display = ('pk', 'text', 'author', 'post', 'created')
+    list_select_related = ('author', 'post')
+    date_hierarchy = 'created'
+    autocomplete_fields = ('author',)
+    raw_id_fields = ('post',)
+
+
+class FollowAdmin(LargeTableAdmin):
+    list_display = ('pk', 'user', 'author', 'created')
+    list_select_related = ('user', 'author')
+    date_hierarchy = 'created'
+    autocomplete_fields = ('user', 'author')
+
+
+class VisitorAdmin(LargeTableAdmin):
+    list_display = ('pk', 'user')
+
+
+class SettingAdmin(admin.ModelAdmin):
+    list_display = ('name', 'value', 'user')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
-admin.site.register(Comment)
-admin.site.register(Follow)
-admin.site.register(Visitor)
-admin.site.register(Setting)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
+admin.site.register(Visitor, VisitorAdmin)
+admin.site.register(Setting, SettingAdmin)
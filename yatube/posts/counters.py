@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, UserCounter
+
+User = get_user_model()
+
+
+def bump_user(user_id, **deltas):
+    """Сдвигает счетчики пользователя выражениями F(), не ниже нуля.
+
+    Недостающую строку не создает: при удалении пользователя каскад
+    удаляет его посты и подписки уже после строки счетчиков. Такую
+    строку восстановят get_counters или reconcile_counters.
+    """
+    UserCounter.objects.filter(user_id=user_id).update(**{
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    })
+
+
+def get_counters(user):
+    """Счетчики пользователя; недостающая строка создается пересчетом."""
+    try:
+        return user.counters
+    except UserCounter.DoesNotExist:
+        reconcile_users(User.objects.filter(pk=user.pk))
+        return UserCounter.objects.get(user=user)
+
+
+def bump_post(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=Greatest(F('comments_count') + delta, 0)
+    )
+
+
+def count_subquery(model, field):
+    counts = model.objects.filter(**{field: OuterRef('pk')}).order_by(
+    ).values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts), 0)
+
+
+def reconcile_users(users=None):
+    """Пересчитывает счетчики пользователей, возвращает число строк."""
+    users = User.objects.all() if users is None else users
+    rows = users.annotate(
+        real_posts=count_subquery(Post, 'author'),
+        real_followers=count_subquery(Follow, 'author'),
+        real_following=count_subquery(Follow, 'user'),
+        real_comments=count_subquery(Comment, 'author'),
+    ).values_list(
+        'pk', 'real_posts', 'real_followers', 'real_following',
+        'real_comments',
+    )
+    fixed = 0
+    for pk, posts, followers, following, comments in rows.iterator():
+        UserCounter.objects.update_or_create(user_id=pk, defaults={
+            'posts_count': posts,
+            'followers_count': followers,
+            'following_count': following,
+            'comments_count': comments,
+        })
+        fixed += 1
+    return fixed
+
+
+def reconcile_posts():
+    return Post.objects.update(
+        comments_count=count_subquery(Comment, 'post')
+    )
@@ -0,0 +1,136 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import FeedEntry, Follow, Post, UserCounter
+from .paginators import KeysetPaginator, seek
+
+
+def is_popular(author):
+    """У популярных авторов посты не рассылаются, а читаются при запросе.
+
+    Порог сравнивается со счетчиком подписчиков, а не с их подсчетом.
+    """
+    return UserCounter.objects.filter(
+        user=author, followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def left_popular(author_id):
+    """Автор только что опустился до порога рассылки."""
+    return UserCounter.objects.filter(
+        user_id=author_id, followers_count=settings.FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def fan_out(post):
+    """Добавляет новый пост в ленты подписчиков автора."""
+    if is_popular(post.author):
+        return
+    followers = Follow.objects.filter(author=post.author).values_list(
+        'user_id', flat=True
+    )
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                user_id=user_id,
+                post=post,
+                author_id=post.author_id,
+                created=post.created,
+            )
+            for user_id in followers
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user, author):
+    """Заполняет ленту последними постами автора после подписки."""
+    if is_popular(author):
+        return
+    posts = author.posts.order_by('-created').values_list('id', 'created')
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                user=user, post_id=post_id, author=author, created=created
+            )
+            for post_id, created in posts[:settings.FEED_BACKFILL_LIMIT]
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+def keep_pulling(author_id):
+    """Посты, написанные автором в популярности, не разосланы по лентам.
+
+    Рассылать их задним числом всем подписчикам — сотни тысяч строк на
+    одну отписку, поэтому лента и дальше читает их при запросе: все
+    посты автора до момента спуска ниже порога.
+    """
+    UserCounter.objects.filter(user_id=author_id).update(
+        pulled_until=timezone.now()
+    )
+
+
+def trim(user, author):
+    FeedEntry.objects.filter(user=user, author=author).delete()
+
+
+class FeedPaginator(KeysetPaginator):
+    """Лента подписок: готовые записи FeedEntry плюс посты популярных
+    авторов, выбранные при чтении. У авторов, бывших популярными, при
+    чтении выбираются посты до спуска ниже порога. Оба источника
+    упорядочены по (created, id поста) и сливаются по общему курсору.
+    """
+
+    def __init__(self, user, per_page):
+        limit = settings.FEED_FANOUT_LIMIT
+        authors = Follow.objects.filter(user=user).filter(
+            Q(author__counters__followers_count__gt=limit)
+            | Q(author__counters__pulled_until__isnull=False)
+        ).values_list(
+            'author',
+            'author__counters__followers_count',
+            'author__counters__pulled_until',
+        )
+        popular, pulled = [], Q()
+        for author_id, followers, pulled_until in authors:
+            if followers > limit:
+                popular.append(author_id)
+            else:
+                pulled |= Q(author_id=author_id, created__lte=pulled_until)
+        super().__init__(
+            Post.objects.filter(
+                Q(author__in=popular) | pulled
+            ).select_related('author', 'group'),
+            per_page,
+        )
+        self.entries = FeedEntry.objects.filter(user=user).select_related(
+            'post__author', 'post__group'
+        )
+
+    def fetch(self, limit, offset=0, created=None, pk=None, backward=False):
+        entries = seek(
+            self.entries, created, pk, backward, pk_field='post_id'
+        )
+        stored = [entry.post for entry in entries[:offset + limit]]
+        pulled = super().fetch(offset + limit, 0, created, pk, backward)
+        merged = heapq.merge(
+            stored, pulled,
+            key=lambda post: (post.created, post.pk),
+            reverse=not backward,
+        )
+        return list(islice(unique_posts(merged), offset, offset + limit))
+
+
+def unique_posts(posts):
+    last_pk = None
+    for post in posts:
+        if post.pk != last_pk:
+            yield post
+        last_pk = post.pk
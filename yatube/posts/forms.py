@@ -1,6 +1,9 @@
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
 
 from .models import Post, Comment
+from .uploads import UploadError, process_upload
 
 
 class PostForm(forms.ModelForm):
@@ -17,6 +20,20 @@ class PostForm(forms.ModelForm):
             'image': 'Изображение',
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if not isinstance(image, UploadedFile):
+            return image
+        try:
+            return process_upload(
+                image,
+                settings.POST_IMAGE_MAX_PIXELS,
+                settings.POST_IMAGE_MAX_SIDE,
+                settings.POST_IMAGE_MAX_DECODED_PIXELS,
+            )
+        except UploadError as error:
+            raise forms.ValidationError(str(error))
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
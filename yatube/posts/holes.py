@@ -0,0 +1,29 @@
+from django.template.loader import render_to_string
+
+from core.pagecache import register_hole
+from .models import Follow
+from .visitors import visitor_buffer
+
+
+@register_hole('switcher')
+def switcher(request, arg):
+    return render_to_string('posts/includes/switcher.html', request=request)
+
+
+@register_hole('visitors', late=True)
+def visitors(request, arg):
+    return str(visitor_buffer.count())
+
+
+@register_hole('follow')
+def follow_button(request, username):
+    user = request.user
+    if user.get_username() == username:
+        return ''
+    following = user.is_authenticated and Follow.objects.filter(
+        user=user, author__username=username
+    ).exists()
+    return render_to_string(
+        'posts/includes/follow_button.html',
+        {'username': username, 'following': following},
+    )
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.cache import bump_generations
+from posts.models import Post
+from posts.signals import post_scopes
+from posts.uploads import fill_preview
+
+BATCH_SIZE = 200
+
+
+class Command(BaseCommand):
+    help = 'Строит превью и основной цвет для картинок существующих постов.'
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').filter(image_color='')
+        batch = []
+        done = failed = 0
+        for post in posts.only('id', 'image', 'author', 'group').iterator():
+            try:
+                fill_preview(post)
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f'{post.image}: {error}')
+                continue
+            post.updated = timezone.now()
+            batch.append(post)
+            if len(batch) == BATCH_SIZE:
+                done += self.save(batch)
+                batch = []
+        done += self.save(batch)
+        self.stdout.write(f'Готово: {done}, с ошибками: {failed}')
+
+    def save(self, batch):
+        """Сохраняет пачку; новая дата изменения и поколения кеша
+        сбрасывают закешированные фрагменты и страницы без превью."""
+        Post.objects.bulk_update(
+            batch, ['image_preview', 'image_color', 'updated']
+        )
+        for post in batch:
+            bump_generations(*post_scopes(post))
+        return len(batch)
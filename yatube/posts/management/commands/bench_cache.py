@@ -0,0 +1,67 @@
+import shutil
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.sqlitecache import SQLiteCache
+
+VALUE = '<article>Фрагмент поста</article>' * 60
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность get/set общего кеша SQLite '
+        'с LocMemCache и файловым кешем.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keys', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp()
+        try:
+            backends = {
+                'locmem': LocMemCache('bench', {
+                    'OPTIONS': {'MAX_ENTRIES': options['keys'] * 2},
+                }),
+                'file': FileBasedCache(f'{directory}/file', {
+                    'OPTIONS': {'MAX_ENTRIES': options['keys'] * 2},
+                }),
+                'sqlite': SQLiteCache(f'{directory}/cache.sqlite3', {}),
+            }
+            for name, cache in backends.items():
+                self.stdout.write(f'{name}:')
+                for operation, rate in self.measure(cache, options['keys']):
+                    self.stdout.write(f'{operation:>12}: {rate:8.0f} оп/с')
+        finally:
+            shutil.rmtree(directory)
+
+    @staticmethod
+    def measure(cache, count):
+        keys = [f'bench:{number}' for number in range(count)]
+        batches = [keys[start:start + 10] for start in range(0, count, 10)]
+        operations = (
+            ('set', lambda: [cache.set(key, VALUE) for key in keys]),
+            ('get', lambda: [cache.get(key) for key in keys]),
+            ('get miss', lambda: [cache.get(key + ':x') for key in keys]),
+            ('set_many 10', lambda: [
+                cache.set_many(dict.fromkeys(batch, VALUE))
+                for batch in batches
+            ]),
+            ('get_many 10', lambda: [
+                cache.get_many(batch) for batch in batches
+            ]),
+            ('incr', lambda: [
+                cache.set('counter', 0),
+                *(cache.incr('counter') for key in keys),
+            ]),
+        )
+        for operation, func in operations:
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            calls = len(batches) if operation.endswith('10') else count
+            yield operation, calls / elapsed
@@ -0,0 +1,110 @@
+import io
+import random
+import re
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from PIL import Image, ImageDraw
+
+from core.bench import benchmark_database
+from posts.models import Post
+from posts.thumbnails import generate
+
+User = get_user_model()
+
+SOURCE_RE = re.compile(r'<source type="image/webp" srcset="([^"]+)"')
+IMG_RE = re.compile(r'<img class="card-img[^>]*?src="([^"]+)"')
+
+# (название, ширина окна в CSS-пикселях, плотность пикселей)
+CLIENTS = (
+    ('desktop', 960, 1),
+    ('mobile', 360, 2),
+)
+
+
+def photo(seed):
+    """Картинка 2400x1600, похожая на фото: градиент, фигуры, шум."""
+    rng = random.Random(seed)
+    image = Image.linear_gradient('L').resize((2400, 1600)).convert('RGB')
+    draw = ImageDraw.Draw(image)
+    for _ in range(60):
+        x, y = rng.randrange(2400), rng.randrange(1600)
+        size = rng.randrange(40, 400)
+        draw.ellipse(
+            (x, y, x + size, y + size),
+            fill=tuple(rng.randrange(256) for _ in range(3)),
+        )
+    noise = Image.effect_noise((2400, 1600), 40).convert('RGB')
+    image = Image.blend(image, noise, 0.2)
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def file_size(url):
+    return default_storage.size(url[len(settings.MEDIA_URL):])
+
+
+def pick(srcset, needed):
+    """Кандидат srcset, который выберет браузер: самый узкий не уже
+    нужного, а если такого нет — самый широкий."""
+    candidates = sorted(
+        (int(width.rstrip('w')), url)
+        for url, width in (item.split() for item in srcset.split(', '))
+    )
+    for width, url in candidates:
+        if width >= needed:
+            return url
+    return candidates[-1][1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает байты картинок главной страницы из 10 постов: одна '
+        'обрезка 960x339 в JPEG против srcset с WebP.'
+    )
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp()
+        try:
+            with override_settings(MEDIA_ROOT=media_root), \
+                    benchmark_database():
+                self.run()
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+    def run(self):
+        author = User.objects.create_user(username='bench')
+        for number in range(10):
+            post = Post.objects.create(
+                text=f'Пост с картинкой №{number}',
+                author=author,
+                image=SimpleUploadedFile(
+                    f'photo{number}.jpg', photo(number), 'image/jpeg'
+                ),
+            )
+            generate(post.image.name)
+        html = Client().get('/').content.decode()
+        fallback = IMG_RE.findall(html)
+        webp = SOURCE_RE.findall(html)
+        originals = sum(
+            default_storage.size(post.image.name)
+            for post in Post.objects.all()
+        )
+        self.stdout.write(f'картинок на странице: {len(fallback)}')
+        self.stdout.write(f'{"originals":>10}: {originals:>9} байт')
+        self.stdout.write(
+            f'{"960 jpeg":>10}: {sum(map(file_size, fallback)):>9} байт'
+        )
+        for name, viewport, density in CLIENTS:
+            total = sum(
+                file_size(pick(srcset, viewport * density))
+                for srcset in webp
+            )
+            self.stdout.write(f'{name:>10}: {total:>9} байт')
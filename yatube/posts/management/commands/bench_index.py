@@ -0,0 +1,88 @@
+import ipaddress
+import itertools
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+
+from core.bench import benchmark_database, measure, summary
+from posts.models import Visitor, visitor_key
+from posts.visitors import visitor_buffer
+
+BATCH_SIZE = 10000
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время ответа главной страницы '
+        'при разном количестве записей о посетителях.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', nargs='+', type=int,
+            default=[10000, 1000000, 10000000],
+        )
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument(
+            '--new-share', type=float, default=0.1,
+            help='Доля запросов от новых посетителей.',
+        )
+
+    def handle(self, *args, **options):
+        # Замеряется путь с записью строк Visitor: без нее число строк в
+        # таблице на ответ не влияет.
+        store_rows = visitor_buffer.store_rows
+        visitor_buffer.store_rows = True
+        try:
+            with benchmark_database():
+                seeded = 0
+                for rows in sorted(options['rows']):
+                    self.seed(seeded, rows)
+                    seeded = rows
+                    timings = self.run(rows, options)
+                    self.stdout.write(
+                        f'{rows:>10} visitors: {summary(timings)}'
+                    )
+        finally:
+            visitor_buffer.store_rows = store_rows
+
+    def seed(self, start, stop):
+        for bottom in range(start, stop, BATCH_SIZE):
+            addresses = map(
+                self.ip, range(bottom, min(bottom + BATCH_SIZE, stop))
+            )
+            with transaction.atomic():
+                Visitor.objects.bulk_create(
+                    [
+                        Visitor(user=ip, key=visitor_key(ip))
+                        for ip in addresses
+                    ],
+                    ignore_conflicts=True,
+                )
+
+    @staticmethod
+    def ip(number):
+        return str(ipaddress.IPv4Address(number + 1))
+
+    def run(self, rows, options):
+        cache.clear()
+        visitor_buffer.flush()
+        visitor_buffer.start_warming().join()
+        fresh = itertools.count(rows + 1)
+        new_every = max(1, round(1 / options['new_share']))
+        client = Client()
+        url = reverse('posts:posts_index')
+        counter = itertools.count()
+
+        def request():
+            step = next(counter)
+            if step % new_every == 0:
+                address = self.ip(next(fresh))
+            else:
+                address = self.ip(step * 7919 % rows)
+            client.get(url, REMOTE_ADDR=address)
+
+        return measure(request, options['requests'])
@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from core.bench import benchmark_database, measure, summary
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+def start_response(status, headers):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность главной страницы: полная '
+        'отрисовка, кеш представления, пользователь со входом (общее '
+        'тело и дыры) и аноним из кеша страниц.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with benchmark_database(), override_settings(TIMING_SAMPLE_RATE=0):
+            author = User.objects.create_user(
+                username='bench', first_name='Bench', last_name='Author'
+            )
+            group = Group.objects.create(title='Bench', slug='bench')
+            for number in range(10):
+                Post.objects.create(
+                    text=f'Пост номер {number} ' * 20,
+                    author=author,
+                    group=group,
+                )
+            client = Client()
+            client.force_login(author)
+            session = client.cookies[settings.SESSION_COOKIE_NAME].value
+            handler = WSGIHandler()
+
+            def request(cookie='', etag=''):
+                environ = {
+                    'REQUEST_METHOD': 'GET',
+                    'PATH_INFO': '/',
+                    'SERVER_NAME': 'localhost',
+                    'SERVER_PORT': '80',
+                    'HTTP_HOST': 'localhost',
+                    'REMOTE_ADDR': '10.0.0.1',
+                    'wsgi.url_scheme': 'http',
+                    'wsgi.input': None,
+                }
+                if cookie:
+                    environ['HTTP_COOKIE'] = cookie
+                if etag:
+                    environ['HTTP_IF_NONE_MATCH'] = etag
+                response = handler(environ, start_response)
+                response.close()
+
+            def render():
+                cache.clear()
+                caches['fragments'].clear()
+                request()
+
+            # Условный заголовок проводит анонима мимо кеша страниц:
+            # так выглядел его путь до него, через кеш представления.
+            modes = (
+                ('render', render),
+                ('view cache', lambda: request(etag='"bench"')),
+                ('signed in', lambda: request(
+                    f'{settings.SESSION_COOKIE_NAME}={session}'
+                )),
+                ('anonymous', request),
+            )
+            for name, func in modes:
+                func()
+                timings = measure(func, options['requests'])
+                rate = len(timings) / sum(timings) * 1000
+                self.stdout.write(
+                    f'{name:>11}: {rate:7.0f} req/s, {summary(timings)}'
+                )
@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+
+from core.bench import benchmark_database, measure, summary
+from posts.models import Group, Post
+from posts.templatetags.post_fragments import (
+    FRAGMENT_TEMPLATE, post_fragments,
+)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает отрисовку страницы из 10 постов без кеша фрагментов, '
+        'с холодным и с прогретым кешем.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            author = User.objects.create_user(
+                username='bench', first_name='Bench', last_name='Author'
+            )
+            group = Group.objects.create(title='Bench', slug='bench')
+            for number in range(10):
+                Post.objects.create(
+                    text=f'Пост для замера №{number} ' * 20,
+                    author=author,
+                    group=group,
+                )
+            posts = list(Post.objects.select_related('author', 'group')[:10])
+            fragments = caches['fragments']
+
+            def no_cache():
+                for post in posts:
+                    render_to_string(FRAGMENT_TEMPLATE, {'post': post})
+
+            def cold():
+                fragments.clear()
+                post_fragments(posts)
+
+            def warm():
+                post_fragments(posts)
+
+            repeat = options['repeat']
+            for name, func in (
+                ('no cache', no_cache), ('cold', cold), ('warm', warm)
+            ):
+                self.stdout.write(
+                    f'{name:>8}: {summary(measure(func, repeat))}'
+                )
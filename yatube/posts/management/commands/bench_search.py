@@ -0,0 +1,78 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import transaction
+
+from core.bench import benchmark_database, measure, summary
+from posts.models import Post
+from posts.search import SearchResults
+
+User = get_user_model()
+BATCH_SIZE = 10000
+WORDS = (
+    'кот собака дом город река лес солнце дождь утро вечер книга письмо '
+    'дорога окно море поле гора сад друг работа музыка картина поезд чай'
+).split()
+SYLLABLES = 'ба ве ги до жу зо ки ла ме но пу ра си то фу ха це чи ша'.split()
+QUERIES = ('кот', 'дорогами', 'солнце дождь', 'музыкой', 'зебра')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск по тексту постов через LIKE '
+        'и через полнотекстовый индекс FTS5.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--requests', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            self.seed(options['rows'])
+            for query in QUERIES:
+                for name, search in (('like', self.like), ('fts', self.fts)):
+                    timings = measure(
+                        lambda: search(query), options['requests']
+                    )
+                    self.stdout.write(
+                        f'{query:>14} {name:>4}: {summary(timings)}'
+                    )
+
+    def seed(self, rows):
+        author = User.objects.create_user(username='bench')
+        rng = random.Random(0)
+        # Частоты слов по закону Ципфа: словарь из редких выдуманных
+        # слов, между которыми расставлены слова запросов.
+        vocabulary = [
+            a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES
+        ]
+        for rank, word in enumerate(WORDS):
+            vocabulary.insert(rank * rank * 10, word)
+        weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+        for bottom in range(0, rows, BATCH_SIZE):
+            with transaction.atomic():
+                Post.objects.bulk_create(
+                    Post(
+                        author=author,
+                        text=' '.join(
+                            rng.choices(vocabulary, weights, k=30)
+                        ),
+                    )
+                    for _ in range(min(BATCH_SIZE, rows - bottom))
+                )
+
+    @staticmethod
+    def like(query):
+        posts = Post.objects.select_related('author', 'group')
+        for word in query.split():
+            posts = posts.filter(text__icontains=word)
+        page = Paginator(posts, 10).get_page(1)
+        return list(page)
+
+    @staticmethod
+    def fts(query):
+        page = Paginator(SearchResults(query), 10).get_page(1)
+        return list(page)
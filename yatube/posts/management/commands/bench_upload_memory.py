@@ -0,0 +1,96 @@
+import io
+import multiprocessing
+import os
+import resource
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from posts.uploads import process_upload
+
+WIDTH, HEIGHT = 5472, 3648
+
+
+def peak_rss():
+    """Пик памяти процесса в байтах. VmHWM, в отличие от ru_maxrss,
+    не наследует пик родителя через exec."""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def in_memory(path):
+    """Старый путь: файл целиком в памяти, полный декод кадра."""
+    with open(path, 'rb') as source:
+        data = io.BytesIO(source.read())
+    with Image.open(data) as image:
+        image.load()
+        image.save(io.BytesIO(), 'JPEG', quality=88)
+
+
+class DiskUpload:
+    """Загрузка, уже записанная обработчиком Django во временный файл."""
+
+    name = 'photo.jpg'
+    content_type = 'image/jpeg'
+
+    def __init__(self, path):
+        self.path = path
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def pipeline(path):
+    process_upload(
+        DiskUpload(path),
+        settings.POST_IMAGE_MAX_PIXELS,
+        settings.POST_IMAGE_MAX_SIDE,
+        settings.POST_IMAGE_MAX_DECODED_PIXELS,
+    ).close()
+
+
+def measure(name, path, queue):
+    func = {'in memory': in_memory, 'pipeline': pipeline}[name]
+    before = peak_rss()
+    func(path)
+    queue.put(peak_rss() - before)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пиковую память обработки загрузки 20 Мп JPEG: '
+        'чтение в память с полным декодом и потоковый конвейер.'
+    )
+
+    def handle(self, *args, **options):
+        handle, path = tempfile.mkstemp(suffix='.jpg')
+        os.close(handle)
+        try:
+            image = Image.effect_noise((WIDTH, HEIGHT), 60).convert('RGB')
+            image.save(path, 'JPEG', quality=90)
+            del image
+            self.stdout.write(
+                f'{WIDTH}x{HEIGHT}, {os.path.getsize(path)} байт'
+            )
+            context = multiprocessing.get_context('spawn')
+            for name in ('in memory', 'pipeline'):
+                queue = context.Queue()
+                process = context.Process(
+                    target=measure, args=(name, path, queue)
+                )
+                process.start()
+                growth = queue.get()
+                process.join()
+                self.stdout.write(
+                    f'{name:>10}: +{growth / 2 ** 20:.1f} МБ пиковой памяти'
+                )
+        finally:
+            os.remove(path)
@@ -0,0 +1,45 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.storage import post_images
+from posts.thumbnails import release_unused
+
+UPLOAD_DIR = Post._meta.get_field('image').upload_to
+
+
+def walk(storage, directory):
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield os.path.join(directory, name).replace('\\', '/')
+    for name in directories:
+        yield from walk(storage, os.path.join(directory, name))
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки постов, на которые не ссылается ни один пост, '
+        'вместе с их миниатюрами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        if not post_images.exists(UPLOAD_DIR):
+            return
+        used = set(
+            Post.objects.exclude(image='').values_list('image', flat=True)
+        )
+        removed = 0
+        for name in walk(post_images, UPLOAD_DIR):
+            if name in used:
+                continue
+            if options['dry_run']:
+                self.stdout.write(name)
+                removed += 1
+            elif release_unused(name):
+                self.stdout.write(name)
+                removed += 1
+        self.stdout.write(f'Сирот: {removed}')
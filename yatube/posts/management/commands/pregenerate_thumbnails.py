@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts.models import Post
+from posts.thumbnails import generate
+
+
+def generate_in_thread(name):
+    try:
+        generate(name)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Создает миниатюры всех размеров для картинок существующих постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 0:
+            raise CommandError('--workers не может быть отрицательным.')
+        names = Post.objects.exclude(image='').order_by().values_list(
+            'image', flat=True
+        ).distinct()
+        done = failed = 0
+        for name, error in self.generate_all(names, options['workers']):
+            if error is None:
+                done += 1
+            else:
+                failed += 1
+                self.stderr.write(f'{name}: {error}')
+        self.stdout.write(f'Готово: {done}, с ошибками: {failed}')
+
+    @staticmethod
+    def generate_all(names, workers):
+        """Пары (картинка, ошибка или None); при workers=0 без потоков."""
+        if not workers:
+            for name in names.iterator():
+                try:
+                    generate(name)
+                except Exception as error:
+                    yield name, error
+                else:
+                    yield name, None
+            return
+        with ThreadPoolExecutor(workers) as executor:
+            futures = [
+                (name, executor.submit(generate_in_thread, name))
+                for name in names.iterator()
+            ]
+            for name, future in futures:
+                try:
+                    future.result()
+                except Exception as error:
+                    yield name, error
+                else:
+                    yield name, None
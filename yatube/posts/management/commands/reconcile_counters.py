@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile_posts, reconcile_users
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счетчики постов и пользователей.'
+
+    def handle(self, *args, **options):
+        users = reconcile_users()
+        posts = reconcile_posts()
+        self.stdout.write(
+            f'Пересчитано пользователей: {users}, постов: {posts}'
+        )
@@ -0,0 +1,44 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from posts.models import Visitor
+from posts.sketches import HyperLogLog
+from posts.visitors import VISITORS_COUNT_KEY, merge_sketch
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит посетителей из таблицы Visitor в дневной скетч '
+        'HyperLogLog и при необходимости очищает таблицу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--day', type=parse_date,
+            help='День, к которому отнести посетителей (по умолчанию сегодня).'
+                 ' У записей Visitor нет даты визита.',
+        )
+        parser.add_argument(
+            '--prune', action='store_true',
+            help='Удалить перенесенные записи, кроме связанных с Setting.',
+        )
+
+    def handle(self, *args, **options):
+        day = options['day'] or timezone.localdate()
+        sketch = HyperLogLog()
+        last_id = 0
+        rows = Visitor.objects.order_by('id').values_list('id', 'key')
+        for last_id, key in rows.iterator(chunk_size=10000):
+            sketch.add(key)
+        merge_sketch(day, '', sketch)
+        cache.delete(VISITORS_COUNT_KEY)
+        self.stdout.write(
+            f'{day}: ~{round(sketch.estimate())} уникальных посетителей'
+        )
+        if options['prune']:
+            deleted, _ = Visitor.objects.filter(
+                id__lte=last_id, setting__isnull=True
+            ).delete()
+            self.stdout.write(f'Удалено записей: {deleted}')
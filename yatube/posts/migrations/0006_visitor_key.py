@@ -0,0 +1,93 @@
+import hashlib
+import ipaddress
+
+from django.db import migrations, models
+
+
+def visitor_key(ip):
+    ip = ip.strip().lower()
+    try:
+        ip = ipaddress.ip_address(ip).compressed
+    except ValueError:
+        pass
+    return hashlib.sha256(ip.encode()).hexdigest()
+
+
+BATCH_SIZE = 2000
+
+MOVE_SETTINGS = """
+    UPDATE {setting} SET {user_id} = (
+        SELECT MIN(k.{id}) FROM {visitor} k
+        JOIN {visitor} v ON v.{key} = k.{key}
+        WHERE v.{id} = {setting}.{user_id}
+    )
+    WHERE {user_id} IN (
+        SELECT MIN(v.{id}) FROM {visitor} v
+        JOIN {setting} s ON s.{user_id} = v.{id}
+        GROUP BY v.{key}
+    ) AND {user_id} NOT IN ({keepers})
+"""
+
+
+def fill_keys(Visitor):
+    batch = []
+    visitors = Visitor.objects.only('id', 'user').iterator(
+        chunk_size=BATCH_SIZE
+    )
+    for visitor in visitors:
+        visitor.key = visitor_key(visitor.user or '')
+        batch.append(visitor)
+        if len(batch) == BATCH_SIZE:
+            Visitor.objects.bulk_update(batch, ['key'])
+            batch = []
+    Visitor.objects.bulk_update(batch, ['key'])
+
+
+def fill_keys_and_deduplicate(apps, schema_editor):
+    """Остается посетитель с наименьшим id на ключ. Если у него нет
+    настройки, ему переходит настройка первого дубликата.
+    """
+    Visitor = apps.get_model('posts', 'Visitor')
+    Setting = apps.get_model('posts', 'Setting')
+    fill_keys(Visitor)
+    names = {
+        name: schema_editor.quote_name(name)
+        for name in ('id', 'key', 'user_id')
+    }
+    names['visitor'] = schema_editor.quote_name(Visitor._meta.db_table)
+    names['setting'] = schema_editor.quote_name(Setting._meta.db_table)
+    names['keepers'] = 'SELECT MIN({id}) FROM {visitor} GROUP BY {key}'.format(
+        **names
+    )
+    schema_editor.execute(MOVE_SETTINGS.format(**names))
+    schema_editor.execute(
+        'DELETE FROM {setting} WHERE {user_id} NOT IN ({keepers})'.format(
+            **names
+        )
+    )
+    schema_editor.execute(
+        'DELETE FROM {visitor} WHERE {id} NOT IN ({keepers})'.format(**names)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_post_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='visitor',
+            name='key',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(
+            fill_keys_and_deduplicate, migrations.RunPython.noop
+        ),
+        migrations.AlterField(
+            model_name='visitor',
+            name='key',
+            field=models.CharField(editable=False, max_length=64, unique=True),
+        ),
+    ]
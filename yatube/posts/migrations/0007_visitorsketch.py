@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-17 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_visitor_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VisitorSketch',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True, verbose_name='День')),
+                ('scope', models.CharField(blank=True, default='', help_text='Пусто для всего сайта, group:<slug> или profile:<username>', max_length=255, verbose_name='Раздел')),
+                ('registers', models.BinaryField()),
+            ],
+            options={
+                'verbose_name': 'Скетч посетителей',
+                'verbose_name_plural': 'Скетчи посетителей',
+                'unique_together': {('day', 'scope')},
+            },
+        ),
+    ]
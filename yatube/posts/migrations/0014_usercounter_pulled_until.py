@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-17 19:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usercounter',
+            name='pulled_until',
+            field=models.DateTimeField(blank=True, help_text='Когда автор в последний раз опустился до порога рассылки', null=True, verbose_name='Посты до этого времени читаются при запросе'),
+        ),
+    ]
@@ -1,6 +1,10 @@
+import hashlib
+import ipaddress
+
 from django.contrib.auth import get_user_model
 from django.db import models
 from core.models import CreatedModel
+from .storage import post_images
 
 User = get_user_model()
 
@@ -28,17 +32,54 @@ class Post(CreatedModel):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=post_images,
         blank=True
     )
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
+    image_preview = models.TextField(
+        'Превью картинки',
+        blank=True,
+        editable=False,
+    )
+    image_color = models.CharField(
+        'Основной цвет картинки',
+        max_length=7,
+        blank=True,
+        editable=False,
+    )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['created', 'id']),
+            models.Index(fields=['author', 'created', 'id']),
+            models.Index(fields=['group', 'created', 'id']),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        """Счетчик комментариев меняет только counters.bump_post одним
+        UPDATE. Полное сохранение поста его не пишет, иначе правка
+        затерла бы прибавку от параллельного комментария.
+        """
+        if not self._state.adding and not args and (
+            kwargs.get('update_fields') is None
+        ):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'comments_count'
+            ]
+        super().save(*args, **kwargs)
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
@@ -99,13 +140,118 @@ class Follow(CreatedModel):
         verbose_name_plural = 'Подписки',
         unique_together = ('user', 'author',)
 
+
+class UserCounter(models.Model):
+    """Счетчики пользователя, обновляемые при записи вместо COUNT."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
+    pulled_until = models.DateTimeField(
+        'Посты до этого времени читаются при запросе',
+        null=True,
+        blank=True,
+        help_text='Когда автор в последний раз опустился до порога рассылки',
+    )
+
+    class Meta:
+        verbose_name = 'Счетчики пользователя'
+        verbose_name_plural = 'Счетчики пользователей'
+
+    def __str__(self):
+        return str(self.user)
+
+
+class FeedEntry(models.Model):
+    """Запись ленты подписок: пост автора, на которого подписан user.
+
+    Дата копируется из поста, чтобы лента читалась по индексу
+    (user, created) без соединения с подписками.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    created = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created', 'post']),
+            models.Index(fields=['user', 'author']),
+        ]
+        unique_together = ('user', 'post')
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+
+def normalize_ip(ip):
+    """Приводит адрес к каноническому виду (регистр, сокращения IPv6)."""
+    ip = ip.strip().lower()
+    try:
+        return ipaddress.ip_address(ip).compressed
+    except ValueError:
+        return ip
+
+
+def visitor_key(ip):
+    return hashlib.sha256(normalize_ip(ip).encode()).hexdigest()
+
+
 class Visitor(models.Model):
     user = models.TextField(default=None)
+    key = models.CharField(max_length=64, unique=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        if not self.key:
+            self.key = visitor_key(self.user)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.user
 
 
+class VisitorSketch(models.Model):
+    """Скетч HyperLogLog уникальных посетителей за день."""
+    day = models.DateField('День', db_index=True)
+    scope = models.CharField(
+        'Раздел',
+        max_length=255,
+        blank=True,
+        default='',
+        help_text='Пусто для всего сайта, group:<slug> или profile:<username>',
+    )
+    registers = models.BinaryField()
+
+    class Meta:
+        unique_together = ('day', 'scope')
+        verbose_name = 'Скетч посетителей'
+        verbose_name_plural = 'Скетчи посетителей'
+
+    def __str__(self):
+        return f'{self.day} {self.scope}'.strip()
+
+
 class Setting(models.Model):
     user = models.OneToOneField(Visitor, on_delete=models.CASCADE)
     name = models.CharField(max_length=200)
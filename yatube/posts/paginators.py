@@ -0,0 +1,137 @@
+import base64
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Max, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+
+def seek(queryset, created=None, pk=None, backward=False, pk_field='id'):
+    """Сортирует по (created, pk) и отсекает записи по курсору."""
+    if backward:
+        queryset = queryset.order_by('created', pk_field)
+    else:
+        queryset = queryset.order_by('-created', f'-{pk_field}')
+    if created is None:
+        return queryset
+    direction = 'gt' if backward else 'lt'
+    return queryset.filter(
+        Q(**{f'created__{direction}': created})
+        | Q(**{'created': created, f'{pk_field}__{direction}': pk})
+    )
+
+
+class KeysetPaginator(Paginator):
+    """Пагинатор по ключу (created, id).
+
+    Страницы выбираются индексным поиском по диапазону вместо OFFSET,
+    общее количество записей не считается: известно лишь, есть ли
+    страницы до и после текущей.
+    """
+    keyset = True
+
+    def __init__(self, object_list, per_page):
+        super().__init__(
+            object_list.order_by('-created', '-id'), per_page
+        )
+        self.next_cursor = None
+        self.previous_cursor = None
+        self._known_count = 0
+
+    @cached_property
+    def count(self):
+        """Нижняя оценка количества записей, известная по текущей странице."""
+        return self._known_count
+
+    @staticmethod
+    def encode_cursor(obj, number):
+        raw = f'{obj.created.isoformat()}|{obj.pk}|{number}'
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+            created, pk, number = raw.split('|')
+            created = parse_datetime(created)
+            pk, number = int(pk), int(number)
+        except (ValueError, UnicodeError):
+            return None
+        if created is None:
+            return None
+        return created, pk, max(number, 1)
+
+    def get_page(self, number=None, after=None, before=None):
+        """Возвращает страницу по курсору, а для старых ссылок — по номеру."""
+        for cursor, method in ((after, self._after), (before, self._before)):
+            if cursor:
+                decoded = self.decode_cursor(cursor)
+                if decoded is not None:
+                    return method(*decoded)
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        return self._by_number(number)
+
+    def fetch(self, limit, offset=0, created=None, pk=None, backward=False):
+        """Выбирает записи после курсора (или до него при backward).
+
+        При backward записи идут в порядке возрастания ключа.
+        """
+        queryset = seek(self.object_list, created, pk, backward)
+        return list(queryset[offset:offset + limit])
+
+    def _by_number(self, number):
+        """Совместимость со ссылками вида ?page=N без подсчета записей."""
+        bottom = (number - 1) * self.per_page
+        rows = self.fetch(self.per_page + 1, offset=bottom)
+        if not rows and number > 1:
+            return self._by_number(1)
+        return self._build(rows, number, has_more=len(rows) > self.per_page)
+
+    def _after(self, created, pk, number):
+        rows = self.fetch(self.per_page + 1, created=created, pk=pk)
+        return self._build(rows, number, has_more=len(rows) > self.per_page)
+
+    def _before(self, created, pk, number):
+        rows = self.fetch(
+            self.per_page + 1, created=created, pk=pk, backward=True
+        )
+        if len(rows) <= self.per_page:
+            return self._by_number(1)
+        rows = rows[:self.per_page][::-1]
+        return self._build(rows, max(number, 2), has_more=True)
+
+    def _build(self, rows, number, has_more):
+        rows = rows[:self.per_page]
+        self._known_count = (
+            (number - 1) * self.per_page + len(rows) + int(has_more)
+        )
+        if rows and has_more:
+            self.next_cursor = self.encode_cursor(rows[-1], number + 1)
+        if rows and number > 1:
+            self.previous_cursor = self.encode_cursor(rows[0], number - 1)
+        return Page(rows, number, self)
+
+
+class CappedCountPaginator(Paginator):
+    """Пагинатор админки для больших таблиц.
+
+    Записи считаются не дальше ADMIN_COUNT_LIMIT. Если их больше, для
+    списка без фильтров количество оценивается по наибольшему id, для
+    отфильтрованного — принимается равным пределу.
+    """
+
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_COUNT_LIMIT
+        queryset = self.object_list.order_by()
+        count = queryset[:limit + 1].count()
+        if count <= limit:
+            return count
+        if queryset.query.where:
+            return limit
+        top = queryset.aggregate(top=Max('pk'))['top'] or 0
+        return max(limit, top)
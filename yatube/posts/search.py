@@ -0,0 +1,195 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+TABLE = 'posts_post_fts'
+TRIGGERS = ('insert', 'delete', 'update', 'author')
+AUTHOR = "{0}.first_name || ' ' || {0}.last_name || ' ' || {0}.username"
+INSERT = (
+    f'INSERT INTO {TABLE} (rowid, text, author) '
+    f'SELECT p.id, p.text, {AUTHOR.format("u")} FROM posts_post p '
+    'JOIN auth_user u ON u.id = p.author_id'
+)
+CREATE = [
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5('
+    "text, author, tokenize = 'unicode61 remove_diacritics 2')",
+    f'CREATE TRIGGER {TABLE}_insert AFTER INSERT ON posts_post BEGIN '
+    f'{INSERT} AND p.id = new.id; END',
+    f'CREATE TRIGGER {TABLE}_delete AFTER DELETE ON posts_post BEGIN '
+    f'DELETE FROM {TABLE} WHERE rowid = old.id; END',
+    f'CREATE TRIGGER {TABLE}_update '
+    'AFTER UPDATE OF text, author_id ON posts_post BEGIN '
+    f'DELETE FROM {TABLE} WHERE rowid = old.id; '
+    f'{INSERT} AND p.id = new.id; END',
+    f'CREATE TRIGGER {TABLE}_author '
+    'AFTER UPDATE OF first_name, last_name, username ON auth_user BEGIN '
+    f'UPDATE {TABLE} SET author = {AUTHOR.format("new")} '
+    'WHERE rowid IN (SELECT id FROM posts_post WHERE author_id = new.id); '
+    'END',
+]
+
+# Окончания для грубого стемминга: слово ищется по основе как по
+# префиксу, и «котами» находит «кот», «кота», «коты».
+ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ого', 'ему', 'ому',
+    'ыми', 'ими', 'его', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ый', 'ий',
+    'ой', 'ом', 'ем', 'ам', 'ям', 'ах', 'ях', 'ию', 'ья', 'ье', 'ов',
+    'ев', 'ей', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+CYRILLIC = re.compile('^[а-яё]+$')
+HIGHLIGHT_START, HIGHLIGHT_END = '\x02', '\x03'
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def schema_objects(db):
+    with db.cursor() as cursor:
+        cursor.execute(
+            'SELECT name FROM sqlite_master WHERE name LIKE %s',
+            [f'{TABLE}%'],
+        )
+        return {name for name, in cursor.fetchall()}
+
+
+def install(db):
+    """Создает индекс с триггерами и заполняет его по постам."""
+    if db.vendor != 'sqlite':
+        return
+    uninstall(db)
+    with db.cursor() as cursor:
+        for statement in CREATE:
+            cursor.execute(statement)
+        cursor.execute(INSERT)
+
+
+def repair(db):
+    """Пересобирает индекс, если пропали его триггеры: пересборка
+    таблицы в миграциях SQLite удаляет триггеры на ней.
+    """
+    if db.vendor != 'sqlite':
+        return
+    existing = schema_objects(db)
+    if TABLE in existing and not existing.issuperset(
+        f'{TABLE}_{name}' for name in TRIGGERS
+    ):
+        install(db)
+
+
+def uninstall(db):
+    if db.vendor != 'sqlite':
+        return
+    with db.cursor() as cursor:
+        for name in TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {TABLE}_{name}')
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+def stem(word):
+    if CYRILLIC.match(word):
+        for ending in ENDINGS:
+            if word.endswith(ending) and len(word) - len(ending) >= 3:
+                return word[:-len(ending)]
+    return word
+
+
+def match_query(query):
+    """Строка MATCH для FTS5: все слова запроса, каждое по префиксу."""
+    words = re.findall(r'\w+', query.lower())
+    return ' '.join(f'"{stem(word)}"*' for word in words)
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(HIGHLIGHT_START, '<mark>')
+        .replace(HIGHLIGHT_END, '</mark>')
+    )
+
+
+def matching_ids(query):
+    """Подзапрос id постов, подходящих под запрос, для фильтра id__in."""
+    return RawSQL(
+        f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s',
+        [match_query(query)],
+    )
+
+
+class SearchResults:
+    """Ленивый список найденных постов по релевантности для Paginator.
+
+    Каждый пост получает snippet — фрагмент текста с подсвеченными
+    совпадениями. Слишком общий запрос не ранжируется: bm25 пришлось бы
+    считать для каждого совпадения. Без SQLite поиск идет через icontains.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        self.match = match_query(query)
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.get_count()
+        return self._count
+
+    def get_count(self):
+        if not self.match:
+            return 0
+        if not available():
+            return self.fallback().count()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {TABLE} WHERE {TABLE} MATCH %s',
+                [self.match],
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def fallback(self):
+        return Post.objects.filter(text__icontains=self.query)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        offset = index.start or 0
+        limit = index.stop - offset
+        if not self.match or limit <= 0:
+            return []
+        if available():
+            if self.count() > settings.SEARCH_RANK_LIMIT:
+                order = 'rowid DESC'
+            else:
+                order = f'bm25({TABLE}, 1.0, 0.3)'
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT rowid, snippet({TABLE}, 0, %s, %s, %s, 24) '
+                    f'FROM {TABLE} WHERE {TABLE} MATCH %s '
+                    f'ORDER BY {order} LIMIT %s OFFSET %s',
+                    [HIGHLIGHT_START, HIGHLIGHT_END, '…', self.match,
+                     limit, offset],
+                )
+                rows = cursor.fetchall()
+        else:
+            rows = [
+                (post.pk, post.text[:200])
+                for post in self.fallback()[offset:offset + limit]
+            ]
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [pk for pk, _ in rows]
+        )
+        found = []
+        for pk, snippet in rows:
+            if pk in posts:
+                posts[pk].snippet = highlight(snippet)
+                found.append(posts[pk])
+        return found
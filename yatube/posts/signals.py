@@ -0,0 +1,148 @@
+import logging
+
+from django.conf import settings
+from django.db import connections
+from django.db.models.signals import (
+    post_delete, post_init, post_migrate, post_save, pre_save,
+)
+from django.dispatch import receiver
+
+from core.cache import bump_on_commit
+from core.pagecache import page_cache_hit
+from . import counters, feed, search, thumbnails
+from .models import Comment, Follow, Group, Post, UserCounter
+from .uploads import fill_preview
+from .visitors import get_client_ip, visitor_buffer
+
+logger = logging.getLogger(__name__)
+
+
+def post_scopes(post):
+    """Поколения кеша, которые зависят от поста."""
+    scopes = {'feed', f'author:{post.author_id}', f'post:{post.pk}'}
+    for group_id in (post.group_id, getattr(post, '_loaded_group_id', None)):
+        if group_id is not None:
+            scopes.add(f'group:{group_id}')
+    return scopes
+
+
+def follow_scopes(follow):
+    """Подписка меняет счетчики обоих профилей и ленту подписчика."""
+    return (
+        f'author:{follow.author_id}',
+        f'author:{follow.user_id}',
+        f'follow:{follow.user_id}',
+    )
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    instance._loaded_group_id = instance.group_id
+    instance._loaded_image = instance.image.name
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_created(sender, instance, created, update_fields, **kwargs):
+    if created:
+        UserCounter.objects.get_or_create(user=instance)
+    elif update_fields != frozenset({'last_login'}):
+        bump_on_commit(
+            'users', f'author:{instance.pk}', f'user:{instance.pk}'
+        )
+
+
+@receiver(pre_save, sender=Post)
+def post_preview(sender, instance, **kwargs):
+    image = instance.image
+    if image._committed and image.name == instance._loaded_image:
+        return
+    try:
+        fill_preview(instance)
+    except Exception:
+        logger.exception('Не удалось построить превью %s', instance.image)
+        instance.image_preview, instance.image_color = '', ''
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, posts_count=1)
+        feed.fan_out(instance)
+    if instance.image.name != instance._loaded_image:
+        if instance.image:
+            thumbnails.schedule(instance.image.name)
+            thumbnails.attach_image(instance.image.name)
+        thumbnails.release_image(instance._loaded_image)
+    bump_on_commit(*post_scopes(instance))
+    instance._loaded_group_id = instance.group_id
+    instance._loaded_image = instance.image.name
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, posts_count=-1)
+    thumbnails.release_image(instance.image.name)
+    bump_on_commit(*post_scopes(instance))
+
+
+@receiver([post_save, post_delete], sender=Group)
+def group_changed(sender, instance, **kwargs):
+    bump_on_commit('groups', f'group:{instance.pk}')
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_post(instance.post_id, 1)
+        counters.bump_user(instance.author_id, comments_count=1)
+    bump_on_commit(f'post:{instance.post_id}')
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_post(instance.post_id, -1)
+    counters.bump_user(instance.author_id, comments_count=-1)
+    bump_on_commit(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, followers_count=1)
+        counters.bump_user(instance.user_id, following_count=1)
+        feed.backfill(instance.user, instance.author)
+    bump_on_commit(*follow_scopes(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, followers_count=-1)
+    counters.bump_user(instance.user_id, following_count=-1)
+    feed.trim(instance.user_id, instance.author_id)
+    if feed.left_popular(instance.author_id):
+        feed.keep_pulling(instance.author_id)
+    bump_on_commit(*follow_scopes(instance))
+
+
+@receiver(post_migrate)
+def search_index(sender, using, **kwargs):
+    if sender.name == 'posts':
+        search.repair(connections[using])
+
+
+@receiver(page_cache_hit)
+def cached_page_visited(sender, request, **kwargs):
+    """Учитывает визит на страницу, отданную из анонимного кеша."""
+    view_name = request.resolver_match.view_name
+    kwargs = request.resolver_match.kwargs
+    address = get_client_ip(request)
+    if view_name == 'posts:posts_index':
+        visitor_buffer.record(address)
+    elif not settings.VISITORS_SCOPE_SKETCHES:
+        return
+    elif view_name == 'posts:group_list':
+        visitor_buffer.record(address, scope=f'group:{kwargs["slug"]}')
+    elif view_name == 'posts:profile':
+        visitor_buffer.record(
+            address, scope=f'profile:{kwargs["username"]}'
+        )
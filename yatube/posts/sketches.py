@@ -0,0 +1,84 @@
+import hashlib
+import math
+
+
+class BloomFilter:
+    """Вероятностное множество: ложные «да» возможны, ложные «нет» — нет."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = capacity
+        self.count = 0
+        self.size = max(
+            8, int(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hash_count = max(
+            1, round(self.size / capacity * math.log(2))
+        )
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, item):
+        new = False
+        for position in self._positions(item):
+            byte, bit = position >> 3, 1 << (position & 7)
+            if not self.bits[byte] & bit:
+                self.bits[byte] |= bit
+                new = True
+        self.count += new
+
+    @property
+    def full(self):
+        """Заполнен сверх емкости: доля ложных «да» уже выше расчетной."""
+        return self.count >= self.capacity
+
+    def __contains__(self, item):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class HyperLogLog:
+    """Оценка количества уникальных элементов в постоянной памяти.
+
+    Регистры хранятся в bytes и сериализуются как есть; при точности 12
+    скетч занимает 4 КБ, погрешность около 1.6%.
+    """
+    precision = 12
+    size = 1 << precision
+
+    def __init__(self, registers=None):
+        self.registers = bytearray(registers or self.size)
+
+    def add(self, item):
+        value = int.from_bytes(
+            hashlib.blake2b(item.encode(), digest_size=8).digest(), 'big'
+        )
+        index = value >> (64 - self.precision)
+        rest = value & ((1 << (64 - self.precision)) - 1)
+        rank = 64 - self.precision - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def estimate(self):
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        raw = alpha * self.size ** 2 / sum(
+            2.0 ** -register for register in self.registers
+        )
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * self.size and zeros:
+            return self.size * math.log(self.size / zeros)
+        return raw
+
+    def dump(self):
+        return bytes(self.registers)
@@ -0,0 +1,117 @@
+import hashlib
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files import locks
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.utils.deconstruct import deconstructible
+
+LOCK_DIR = '.locks'
+PIN_DIR = '.pins'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файл под именем из SHA-256 содержимого.
+
+    Файл кладется в каталог upload_to, разложенный по двум уровням
+    подкаталогов: posts/ab/cd/abcd....jpg. Одинаковые загрузки
+    получают одно имя и записываются один раз, поэтому и миниатюры
+    у них общие. Файл удаляется, когда на него не ссылается ни один
+    пост, см. posts.thumbnails.release_image.
+
+    Запись, проверка и удаление файла идут под блокировкой его хеша.
+    Повторная загрузка уже лежащего файла закрепляет его: пост с ним
+    еще не зафиксирован, и до того удалять файл нельзя.
+    """
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(
+            directory, digest[:2], digest[2:4], digest + extension
+        )
+
+    def _save(self, name, content):
+        name = self.hashed_name(name, content)
+        try:
+            with self.locked(name):
+                if self.exists(name):
+                    self.pin(name)
+                else:
+                    self._write(name, content)
+            return name.replace('\\', '/')
+        finally:
+            # Временный файл загрузки перенесен в хранилище или не
+            # нужен; без close его удалит сборщик мусора с ошибкой.
+            if isinstance(content, TemporaryUploadedFile):
+                content.close()
+
+    def _write(self, name, content):
+        """Пишет файл целиком под конечным именем, без суффиксов
+        get_available_name: содержимое по этому имени всегда одно.
+        """
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if hasattr(content, 'temporary_file_path'):
+            file_move_safe(
+                content.temporary_file_path(), path, allow_overwrite=True
+            )
+        else:
+            handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(handle, 'wb') as target:
+                for chunk in content.chunks():
+                    target.write(chunk)
+            os.replace(temporary, path)
+        os.chmod(path, self.file_permissions_mode or 0o644)
+
+    def service_path(self, directory, name, create=False):
+        path = self.path(os.path.join(directory, os.path.basename(name)))
+        if create:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    @contextmanager
+    def locked(self, name):
+        """Блокировка между процессами; файлы блокировок общие для
+        хешей с одинаковыми первыми двумя символами.
+        """
+        path = self.service_path(
+            LOCK_DIR, os.path.basename(name)[:2], create=True
+        )
+        with open(path, 'a') as file:
+            locks.lock(file, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(file)
+
+    def pin(self, name):
+        path = self.service_path(PIN_DIR, name, create=True)
+        with open(path, 'a'):
+            os.utime(path)
+
+    def pinned(self, name):
+        try:
+            modified = os.path.getmtime(self.service_path(PIN_DIR, name))
+        except FileNotFoundError:
+            return False
+        return modified > time.time() - settings.POST_IMAGE_PIN_TIMEOUT
+
+    def unpin(self, name):
+        try:
+            os.remove(self.service_path(PIN_DIR, name))
+        except FileNotFoundError:
+            pass
+
+
+post_images = ContentAddressedStorage()
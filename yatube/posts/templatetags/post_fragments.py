@@ -0,0 +1,57 @@
+from django import template
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.cache import get_generations
+from core.timing import count_cache
+from ..thumbnails import attach_thumbnails
+
+register = template.Library()
+
+FRAGMENT_TEMPLATE = 'posts/includes/post_list.html'
+
+
+def fragment_keys(posts):
+    """Ключи фрагментов: дата изменения поста и поколения его автора
+    и групп — фрагмент показывает имя автора и адрес группы.
+    """
+    scopes = ['groups', *{f'user:{post.author_id}' for post in posts}]
+    generations = dict(zip(scopes, get_generations(scopes)))
+    return {
+        post.pk: (
+            f'post_fragment:{post.pk}:{post.updated.timestamp()}:'
+            f'{generations[f"user:{post.author_id}"]}:'
+            f'{generations["groups"]}'
+        )
+        for post in posts
+    }
+
+
+@register.simple_tag
+def post_fragments(posts):
+    """Возвращает пары (пост, готовый HTML) для страницы постов.
+
+    Фрагменты берутся из кеша одним get_many, отрисовываются только
+    промахи. Ключ включает дату изменения поста и поколения автора и
+    групп, поэтому правка поста, профиля или группы сразу дает новый
+    фрагмент.
+    """
+    fragments = caches['fragments']
+    posts = list(posts)
+    keys = fragment_keys(posts)
+    found = fragments.get_many(keys.values())
+    missing = {}
+    attach_thumbnails(
+        post for post in posts if keys[post.pk] not in found
+    )
+    for post in posts:
+        if keys[post.pk] not in found:
+            html = render_to_string(FRAGMENT_TEMPLATE, {'post': post})
+            found[keys[post.pk]] = missing[keys[post.pk]] = html
+    count_cache(
+        'fragment', hits=len(posts) - len(missing), misses=len(missing)
+    )
+    if missing:
+        fragments.set_many(missing)
+    return [(post, mark_safe(found[keys[post.pk]])) for post in posts]
@@ -0,0 +1,19 @@
+from django import template
+
+from ..thumbnails import attach_thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post):
+    """Готовая миниатюра картинки поста или None, пока она создается.
+
+    Обычно миниатюры уже найдены для всей страницы разом; одиночный
+    пост ищется здесь.
+    """
+    if not post.image:
+        return None
+    if not hasattr(post, 'thumbnail'):
+        attach_thumbnails([post])
+    return post.thumbnail
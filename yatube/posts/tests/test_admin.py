@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, Visitor
+from ..paginators import CappedCountPaginator
+
+User = get_user_model()
+CHANGELISTS = ('post', 'comment', 'follow', 'visitor')
+
+
+@override_settings(ADMIN_COUNT_LIMIT=5)
+class AdminChangelistTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        cls.number = 0
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_rows(self, count):
+        for _ in range(count):
+            number = self.number = self.number + 1
+            author = User.objects.create_user(username=f'author_{number}')
+            group = Group.objects.create(
+                title=f'Группа {number}', slug=f'group_{number}'
+            )
+            post = Post.objects.create(
+                text=f'Пост {number}', author=author, group=group
+            )
+            Comment.objects.create(post=post, author=author, text='Ответ')
+            Follow.objects.create(user=self.admin, author=author)
+            Visitor.objects.create(user=f'10.0.0.{number}')
+
+    def changelist_queries(self):
+        queries = {}
+        for model in CHANGELISTS:
+            url = reverse(f'admin:posts_{model}_changelist')
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            queries[model] = len(context)
+        return queries
+
+    def test_query_count_flat(self):
+        """Число запросов списка не растет вместе с таблицей."""
+        self.add_rows(6)
+        before = self.changelist_queries()
+        self.add_rows(30)
+        self.assertEqual(self.changelist_queries(), before)
+
+    def test_capped_count(self):
+        self.add_rows(8)
+        posts = Post.objects.all()
+        self.assertEqual(
+            CappedCountPaginator(posts, 2).count, posts.latest('pk').pk
+        )
+        self.assertEqual(
+            CappedCountPaginator(posts.filter(pk__gt=0), 2).count, 5
+        )
+        self.assertEqual(
+            CappedCountPaginator(posts.filter(pk__lt=0), 2).count, 0
+        )
@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post
+from ..views import COMMENTS_PER_PAGE
+
+User = get_user_model()
+
+
+class CommentChunksTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Пост', author=author)
+        for number in range(COMMENTS_PER_PAGE * 2 + 5):
+            Comment.objects.create(
+                post=cls.post, author=author, text=f'Ответ {number}'
+            )
+        cls.detail_url = reverse('posts:post_detail', args=[cls.post.pk])
+        cls.fragment_url = reverse('posts:post_comments', args=[cls.post.pk])
+
+    def test_chunks_cover_all_comments(self):
+        """Первая порция на странице поста, остальные — по курсору."""
+        response = self.client.get(self.detail_url)
+        comments = response.context['comments']
+        seen = list(comments)
+        self.assertEqual(len(seen), COMMENTS_PER_PAGE)
+        while comments.paginator.next_cursor:
+            response = self.client.get(
+                self.fragment_url, {'after': comments.paginator.next_cursor}
+            )
+            comments = response.context['comments']
+            seen.extend(comments)
+        self.assertEqual(len(response.context['comments']), 5)
+        self.assertNotContains(response, 'Показать ещё')
+        self.assertEqual(
+            [comment.pk for comment in seen],
+            list(self.post.comments.values_list('pk', flat=True)),
+        )
+
+    def test_queries_do_not_grow(self):
+        with self.assertNumQueries(2):
+            self.client.get(self.detail_url)
+        with self.assertNumQueries(1):
+            self.client.get(self.fragment_url)
+
+    def test_missing_post(self):
+        response = self.client.get(reverse('posts:post_comments', args=[0]))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,109 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+        cls.pages = {
+            'index': (reverse('posts:posts_index'), 0),
+            'group': (reverse('posts:group_list', args=['group']), 1),
+            'profile': (reverse('posts:profile', args=['author']), 1),
+            'detail': (
+                reverse('posts:post_detail', args=[cls.post.pk]), 1
+            ),
+        }
+
+    def setUp(self):
+        cache.clear()
+        caches['fragments'].clear()
+
+    def test_unchanged_pages_not_modified(self):
+        """Без изменений — 304 не больше чем за один запрос к базе."""
+        for name, (url, max_queries) in self.pages.items():
+            with self.subTest(page=name):
+                response = self.client.get(url)
+                self.assertIn('no-cache', response['Cache-Control'])
+                with self.assertNumQueries(max_queries):
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate(self):
+        etags = {
+            name: self.client.get(url)['ETag']
+            for name, (url, _) in self.pages.items()
+        }
+        Comment.objects.create(post=self.post, author=self.author, text='!')
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for name, (url, _) in self.pages.items():
+            with self.subTest(page=name):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[name]
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_header_is_part_of_validator(self):
+        """Шапка с именем пользователя не отдается из чужого кеша."""
+        url = self.pages['group'][0]
+        etag = self.client.get(url)['ETag']
+        self.client.force_login(self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.author.username = 'writer'
+        self.author.save()
+        response = self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertContains(response, 'writer')
+
+    def test_visitors_are_part_of_validator(self):
+        """Новое число посетителей на главной не прячется за 304."""
+        url = self.pages['index'][0]
+        with mock.patch('posts.holes.visitor_buffer.count',
+                        return_value=5):
+            etag = self.client.get(url)['ETag']
+        with mock.patch('posts.holes.visitor_buffer.count',
+                        return_value=6):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'ВСЕГО ПОСЕТИТЕЛЕЙ: 6')
+
+    def test_host_is_part_of_validator(self):
+        url = self.pages['index'][0]
+        etag = self.client.get(url, HTTP_HOST='localhost')['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_stale_page_while_refreshing(self):
+        """Пока другой запрос строит страницу, отдается прежняя без
+        ETag, чтобы браузер не принял ее за новую.
+        """
+        url = reverse('posts:group_list', args=['group'])
+        self.client.get(url)
+        Post.objects.create(text='Новый пост', author=self.author,
+                            group=self.group)
+        with mock.patch('django.core.cache.cache.add', return_value=False):
+            response = self.client.get(url)
+        self.assertNotContains(response, 'Новый пост')
+        self.assertNotIn('ETag', response)
+        response = self.client.get(url)
+        self.assertContains(response, 'Новый пост')
+        self.assertIn('ETag', response)
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase
+
+from ..counters import reconcile_posts, reconcile_users
+from ..models import Comment, Follow, Post, UserCounter
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='counted')
+        self.reader = User.objects.create_user(username='reader')
+
+    def counters(self, user):
+        return UserCounter.objects.get(user=user)
+
+    def test_counters_follow_changes(self):
+        """Счетчики меняются при создании и удалении объектов."""
+        post = Post.objects.create(text='Текст', author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        self.assertEqual(self.counters(self.author).followers_count, 1)
+        self.assertEqual(self.counters(self.reader).following_count, 1)
+        self.assertEqual(self.counters(self.reader).comments_count, 1)
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(self.counters(self.author).followers_count, 0)
+        self.assertEqual(self.counters(self.reader).comments_count, 0)
+
+    def test_reconcile_fixes_drift(self):
+        post = Post.objects.create(text='Текст', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='Текст')
+        UserCounter.objects.filter(user=self.author).update(posts_count=7)
+        Post.objects.filter(pk=post.pk).update(comments_count=0)
+        reconcile_users()
+        reconcile_posts()
+        post.refresh_from_db()
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        self.assertEqual(post.comments_count, 1)
+
+    def test_edit_keeps_comments_count(self):
+        """Правка поста, загруженного до комментария, не сбрасывает
+        счетчик.
+        """
+        post = Post.objects.create(text='Текст', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='Текст')
+        post.text = 'Новый текст'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Новый текст')
+        self.assertEqual(post.comments_count, 1)
+
+    def test_drifted_counter_not_negative(self):
+        post = Post.objects.create(text='Текст', author=self.author)
+        UserCounter.objects.filter(user=self.author).update(posts_count=0)
+        post.delete()
+        self.assertEqual(self.counters(self.author).posts_count, 0)
+
+
+class UserDeletionTest(TransactionTestCase):
+    def test_user_with_content_deleted(self):
+        """Каскад удаления не пересоздает строку счетчиков."""
+        author = User.objects.create_user(username='leaving')
+        reader = User.objects.create_user(username='staying')
+        post = Post.objects.create(text='Текст', author=author)
+        Comment.objects.create(post=post, author=reader, text='Текст')
+        Follow.objects.create(user=reader, author=author)
+        author.delete()
+        self.assertFalse(UserCounter.objects.filter(user_id=author.pk))
+        self.assertEqual(
+            UserCounter.objects.get(user=reader).following_count, 0
+        )
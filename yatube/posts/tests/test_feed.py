@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import FeedEntry, Follow, Post
+
+User = get_user_model()
+
+
+class FeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.star = User.objects.create_user(username='star')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed_texts(self, **params):
+        response = self.client.get(reverse('posts:follow_index'), params)
+        return [post.text for post in response.context['page_obj']]
+
+    def test_fan_out_and_trim(self):
+        """Пост попадает в ленту подписчика и пропадает после отписки."""
+        Post.objects.create(text='До подписки', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(text='После подписки', author=self.author)
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 2
+        )
+        self.assertEqual(
+            self.feed_texts(), ['После подписки', 'До подписки']
+        )
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.feed_texts(), [])
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_popular_author_is_pulled_on_read(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.star)
+        Follow.objects.create(user=self.author, author=self.star)
+        for number in range(8):
+            Post.objects.create(text=f'author {number}', author=self.author)
+            Post.objects.create(text=f'star {number}', author=self.star)
+        self.assertFalse(
+            FeedEntry.objects.filter(author=self.star).exists()
+        )
+        first_page = self.client.get(
+            reverse('posts:follow_index')
+        ).context['page_obj']
+        second_page = self.feed_texts(
+            after=first_page.paginator.next_cursor
+        )
+        texts = [post.text for post in first_page] + second_page
+        expected = [
+            f'{name} {number}'
+            for number in reversed(range(8)) for name in ('star', 'author')
+        ]
+        self.assertEqual(texts, expected)
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_posts_of_former_popular_author_pulled(self):
+        """Посты, написанные в популярности, остаются в лентах после
+        спуска автора ниже порога.
+        """
+        Follow.objects.create(user=self.reader, author=self.star)
+        follow = Follow.objects.create(user=self.author, author=self.star)
+        Post.objects.create(text='Звездный пост', author=self.star)
+        self.assertFalse(FeedEntry.objects.exists())
+        follow.delete()
+        self.assertFalse(FeedEntry.objects.exists())
+        Post.objects.create(text='Новый пост', author=self.star)
+        self.assertEqual(
+            self.feed_texts(), ['Новый пост', 'Звездный пост']
+        )
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 1
+        )
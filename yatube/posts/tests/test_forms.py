@@ -76,7 +76,8 @@ class PostFormTests(TestCase):
         self.assertEqual(Post.objects.count(), posts_count + 1)
         self.assertEqual(my_post.text, form_data['text'])
         self.assertEqual(my_post.group.id, form_data['group'])
-        self.assertIn(form_data['image'].name, my_post.image.name)
+        with my_post.image.open() as image:
+            self.assertEqual(image.read(), small_gif)
 
     def test_edit_post(self):
         posts_count = Post.objects.count()
@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+
+from ..models import Group, Post
+from ..templatetags.post_fragments import fragment_keys, post_fragments
+
+User = get_user_model()
+
+
+class PostFragmentsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='fragments')
+
+    def setUp(self):
+        caches['fragments'].clear()
+        self.post = Post.objects.create(text='Первый текст', author=self.user)
+
+    def test_fragment_rendered_once(self):
+        """Повторная отрисовка берет фрагмент из кеша."""
+        [(_, html)] = post_fragments([self.post])
+        self.assertIn('Первый текст', html)
+        caches['fragments'].set(
+            fragment_keys([self.post])[self.post.pk], 'из кеша'
+        )
+        [(_, html)] = post_fragments([self.post])
+        self.assertEqual(html, 'из кеша')
+
+    def test_edit_changes_key(self):
+        post_fragments([self.post])
+        self.post.text = 'Новый текст'
+        self.post.save()
+        [(_, html)] = post_fragments([self.post])
+        self.assertIn('Новый текст', html)
+
+    def test_author_and_group_change_key(self):
+        """Фрагмент показывает имя автора и адрес группы."""
+        group = Group.objects.create(title='Группа', slug='old-slug')
+        self.post.group = group
+        self.post.save()
+        post_fragments([self.post])
+        self.user.first_name = 'Новое'
+        self.user.save()
+        group.slug = 'new-slug'
+        group.save()
+        [(_, html)] = post_fragments([self.post])
+        self.assertIn('Новое', html)
+        self.assertIn('new-slug', html)
@@ -0,0 +1,67 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import MERGED, MmapValues, registry, sample_key
+
+User = get_user_model()
+
+METRICS_DIR = tempfile.mkdtemp()
+
+
+@override_settings(METRICS_DIR=METRICS_DIR)
+class MetricsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+
+    def test_processes_are_summed(self):
+        """Значения из файлов разных процессов складываются."""
+        key = sample_key('yatube_responses_total', (('view', 'x'),))
+        for pid in (101, 102):
+            values = MmapValues(os.path.join(METRICS_DIR, f'{pid}.db'))
+            values.add(key, 2)
+        totals = registry.collect()
+        self.assertEqual(
+            totals['yatube_responses_total'][(('view', 'x'),)], 4
+        )
+
+    def test_dead_processes_merged(self):
+        """Файл завершившегося процесса сливается и удаляется."""
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        key = sample_key('yatube_responses_total', (('view', 'dead'),))
+        path = os.path.join(METRICS_DIR, f'{process.pid}.db')
+        MmapValues(path).add(key, 3)
+        for _ in range(2):
+            totals = registry.collect()
+            self.assertEqual(
+                totals['yatube_responses_total'][(('view', 'dead'),)], 3
+            )
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(os.path.join(METRICS_DIR, MERGED)))
+
+    def test_endpoint_for_staff_only(self):
+        self.client.get(reverse('posts:posts_index'))
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        text = self.client.get(url).content.decode()
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram', text)
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:posts_index",le="+Inf"}',
+            text,
+        )
+        self.assertIn(
+            'yatube_responses_total{view="posts:posts_index",status="200"}',
+            text,
+        )
@@ -0,0 +1,84 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from ..models import Follow, Post
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Post.objects.create(text='Первый пост', author=cls.author)
+        cls.index = reverse('posts:posts_index')
+        cls.profile = reverse('posts:profile', args=['author'])
+
+    def setUp(self):
+        cache.clear()
+        caches['fragments'].clear()
+
+    @mock.patch('posts.signals.visitor_buffer.record')
+    def test_anonymous_hit_skips_view(self, record):
+        """Повторный анонимный запрос не доходит до базы и view."""
+        first = self.client.get(self.index)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.index)
+        self.assertEqual(second.content, first.content)
+        self.assertNotIn(b'<!--hole:', second.content)
+        self.assertEqual(second['Content-Length'], str(len(second.content)))
+        self.assertEqual(record.call_count, 2)
+        Post.objects.create(text='Второй пост', author=self.author)
+        self.assertContains(self.client.get(self.index), 'Второй пост')
+
+    def test_session_bypasses_anonymous_cache(self):
+        self.client.get(self.index)
+        client = Client()
+        client.cookies[settings.SESSION_COOKIE_NAME] = 'x' * 32
+        with self.assertNumQueries(1):
+            client.get(self.index)
+
+    def test_personal_holes_over_shared_body(self):
+        """Шапка и кнопка подписки свои у каждого, тело — общее."""
+        anonymous = self.client.get(self.profile)
+        self.assertContains(anonymous, 'Подписаться')
+        self.assertContains(anonymous, 'Войти')
+        Follow.objects.create(user=self.reader, author=self.author)
+        cache.clear()
+        self.client.get(self.profile)
+        self.client.force_login(self.reader)
+        reader = self.client.get(self.profile)
+        self.assertContains(reader, 'Отписаться')
+        self.assertContains(reader, 'Пользователь: reader')
+        self.client.force_login(self.author)
+        author = self.client.get(self.profile)
+        self.assertEqual(author.status_code, 200)
+        self.assertNotContains(author, 'Подписаться')
+        self.assertNotContains(author, 'Отписаться')
+        self.assertContains(author, 'Пользователь: author')
+
+
+class GenerationsAfterCommitTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        caches['fragments'].clear()
+        self.author = User.objects.create_user(username='author')
+
+    def test_page_built_before_commit_not_kept(self):
+        """Страница, построенная во время транзакции, не сохраняется под
+        поколением, которое эта транзакция увеличила.
+        """
+        index = reverse('posts:posts_index')
+        with transaction.atomic():
+            Post.objects.create(text='Новый пост', author=self.author)
+            with mock.patch('posts.views.Post.objects.select_related',
+                            side_effect=Post.objects.none().select_related):
+                Client().get(index)
+        self.assertContains(Client().get(index), 'Новый пост')
@@ -0,0 +1,122 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.test import Client, TestCase
+from django.urls import get_resolver, reverse
+
+from core.budgets import QueryBudgetMixin
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Маршрут: (метод, запросов не больше, миллисекунд в базе не больше).
+ROUTE_BUDGETS = {
+    'posts:posts_index': ('get', 4, 100),
+    'posts:group_list': ('get', 4, 100),
+    'posts:profile': ('get', 5, 100),
+    'posts:post_detail': ('get', 4, 100),
+    'posts:post_edit': ('get', 4, 100),
+    'posts:post_create': ('get', 5, 100),
+    'posts:add_comment': ('post', 8, 100),
+    'posts:post_comments': ('get', 3, 100),
+    'posts:search': ('get', 5, 100),
+    'posts:follow_index': ('get', 5, 100),
+    'posts:profile_follow': ('get', 13, 100),
+    'posts:profile_unfollow': ('get', 11, 100),
+    'users:logout': ('get', 4, 100),
+    'users:signup': ('get', 2, 100),
+    'users:login': ('get', 2, 100),
+    'users:password_change_done': ('get', 2, 100),
+    'users:password_change': ('get', 2, 100),
+    'users:password_reset': ('get', 2, 100),
+    'users:password_reset_done': ('get', 2, 100),
+    'users:password_reset_confirm': ('get', 3, 100),
+    'users:password_reset_complete': ('get', 2, 100),
+    'about:tech': ('get', 2, 100),
+    'about:author': ('get', 2, 100),
+    'api:posts': ('get', 3, 100),
+    'api:post': ('get', 3, 100),
+    'api:post_comments': ('get', 4, 100),
+    'api:groups': ('get', 3, 100),
+    'api:group_posts': ('get', 4, 100),
+    'api:profile': ('get', 4, 100),
+    'api:profile_posts': ('get', 4, 100),
+    'api:follow': ('get', 5, 100),
+}
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Каждый именованный маршрут укладывается в бюджет запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        groups = [
+            Group.objects.create(title=f'Группа {n}', slug=f'group_{n}')
+            for n in range(2)
+        ]
+        cls.authors = [
+            User.objects.create_user(username=f'author_{n}')
+            for n in range(3)
+        ]
+        for number in range(15):
+            Post.objects.create(
+                text=f'Пост {number}',
+                author=cls.authors[number % 3],
+                group=groups[number % 2],
+            )
+        cls.post = Post.objects.create(
+            text='Пост читателя', author=cls.reader, group=groups[0]
+        )
+        for number in range(5):
+            Comment.objects.create(
+                post=cls.post, author=cls.authors[number % 3], text='Ответ'
+            )
+        Follow.objects.create(user=cls.reader, author=cls.authors[0])
+        Follow.objects.create(user=cls.reader, author=cls.authors[1])
+        cls.kwargs = {
+            'posts:group_list': {'slug': groups[0].slug},
+            'posts:profile': {'username': cls.authors[0].username},
+            'posts:post_detail': {'post_id': cls.post.pk},
+            'posts:post_edit': {'post_id': cls.post.pk},
+            'posts:add_comment': {'post_id': cls.post.pk},
+            'posts:post_comments': {'post_id': cls.post.pk},
+            'api:post': {'post_id': cls.post.pk},
+            'api:post_comments': {'post_id': cls.post.pk},
+            'api:group_posts': {'slug': groups[0].slug},
+            'api:profile': {'username': cls.authors[0].username},
+            'api:profile_posts': {'username': cls.authors[0].username},
+            'posts:profile_follow': {'username': cls.authors[2].username},
+            'posts:profile_unfollow': {'username': cls.authors[0].username},
+            'users:password_reset_confirm': {
+                'uidb64': 'MQ', 'token': 'set-password'
+            },
+        }
+        cls.data = {
+            'posts:add_comment': {'text': 'Новый комментарий'},
+            'posts:search': {'q': 'пост'},
+        }
+
+    def setUp(self):
+        cache.clear()
+        caches['fragments'].clear()
+
+    def test_every_route_has_budget(self):
+        names = set()
+        for namespace in ('posts', 'users', 'about', 'api'):
+            resolver = get_resolver().namespace_dict[namespace][1]
+            names.update(
+                f'{namespace}:{pattern.name}'
+                for pattern in resolver.url_patterns if pattern.name
+            )
+        self.assertEqual(names, set(ROUTE_BUDGETS))
+
+    def test_routes_within_budget(self):
+        for name, (method, max_queries, max_time) in ROUTE_BUDGETS.items():
+            with self.subTest(route=name):
+                client = Client()
+                client.force_login(self.reader)
+                url = reverse(name, kwargs=self.kwargs.get(name))
+                request = getattr(client, method)
+                with self.assertQueryBudget(name, max_queries, max_time):
+                    response = request(url, self.data.get(name, {}))
+                self.assertLess(response.status_code, 400)
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..search import SearchResults, match_query
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='leo', first_name='Лев', last_name='Толстой'
+        )
+        cls.cats = Post.objects.create(
+            text='Коты спят на <b>солнечном</b> подоконнике', author=cls.author
+        )
+        cls.dogs = Post.objects.create(
+            text='Собака гуляет во дворе', author=cls.author
+        )
+
+    def search(self, query):
+        return list(SearchResults(query)[0:10])
+
+    def test_word_forms_found(self):
+        """Слово находится в другой форме и без учета регистра."""
+        self.assertEqual(match_query('Котами!'), '"кот"*')
+        self.assertEqual(self.search('котами'), [self.cats])
+        self.assertEqual(self.search('СОЛНЕЧНЫЙ'), [self.cats])
+
+    def test_index_follows_changes(self):
+        self.cats.text = 'Кошки'
+        self.cats.save()
+        self.assertEqual(self.search('подоконник'), [])
+        self.dogs.delete()
+        self.assertEqual(self.search('собака'), [])
+        self.assertEqual(SearchResults('').count(), 0)
+
+    def test_search_by_author(self):
+        self.assertEqual(SearchResults('толстой').count(), 2)
+        self.author.last_name = 'Чехов'
+        self.author.save()
+        self.assertEqual(SearchResults('толстой').count(), 0)
+        self.assertEqual(SearchResults('чехов').count(), 2)
+
+    def test_page_escapes_and_highlights(self):
+        response = self.client.get(reverse('posts:search'), {'q': 'коты'})
+        post = response.context['page_obj'][0]
+        self.assertEqual(post, self.cats)
+        self.assertContains(response, '<mark>Коты</mark>')
+        self.assertContains(response, '&lt;b&gt;')
+        self.assertNotContains(response, '<b>солнечном')
+
+    def test_admin_uses_index(self):
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собаки'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.dogs]
+        )
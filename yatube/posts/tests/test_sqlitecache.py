@@ -0,0 +1,84 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.sqlitecache import SQLiteCache
+
+CACHE_DIR = tempfile.mkdtemp()
+
+
+def make_cache(name, **options):
+    return SQLiteCache(
+        os.path.join(CACHE_DIR, f'{name}.sqlite3'), {'OPTIONS': options}
+    )
+
+
+def increment(cache, times):
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+    def test_values_and_timeouts(self):
+        cache = make_cache('values')
+        cache.set_many({'number': 1, 'data': {'a': [1, 2]}})
+        self.assertEqual(
+            cache.get_many(['number', 'data', 'missing']),
+            {'number': 1, 'data': {'a': [1, 2]}},
+        )
+        self.assertEqual(cache.incr('number', 10), 11)
+        self.assertRaises(ValueError, cache.incr, 'missing')
+        self.assertFalse(cache.add('number', 5))
+        cache.set('short', 'value', 0.05)
+        time.sleep(0.1)
+        self.assertIsNone(cache.get('short'))
+        self.assertTrue(cache.add('short', 'again'))
+        self.assertEqual(cache.get('short'), 'again')
+
+    @mock.patch('core.sqlitecache.RETURNING', False)
+    def test_incr_without_returning(self):
+        """SQLite до 3.35: incr через транзакцию."""
+        cache = make_cache('old')
+        cache.set('counter', 1)
+        self.assertEqual(cache.incr('counter', 2), 3)
+        self.assertEqual(cache.get('counter'), 3)
+        self.assertRaises(ValueError, cache.incr, 'missing')
+
+    def test_evicts_least_recently_read(self):
+        """Объем ограничен в байтах, вытесняются давно не читанные."""
+        cache = make_cache('lru', MAX_SIZE=20000)
+        with mock.patch('core.sqlitecache.ACCESS_RESOLUTION', 0):
+            for number in range(30):
+                cache.set(f'key{number}', 'x' * 1000)
+                cache.get('key0')
+        self.assertLessEqual(cache.size(), 20000)
+        self.assertIsNotNone(cache.get('key0'))
+        self.assertIsNotNone(cache.get('key29'))
+        self.assertIsNone(cache.get('key1'))
+
+    def test_shared_between_forked_processes(self):
+        """incr атомарен между процессами; соединение родителя дочерний
+        процесс не использует.
+        """
+        cache = make_cache('shared')
+        cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=increment, args=(cache, 200))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(cache.get('counter'), 800)
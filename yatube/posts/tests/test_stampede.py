@@ -0,0 +1,97 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.test import TestCase, override_settings
+
+from core.cache import get_or_refresh
+
+SLOW_QUERY = (
+    'WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n '
+    'WHERE i < 100000000) SELECT count(*) FROM n'
+)
+
+
+@override_settings(CACHE_XFETCH_BETA=0)
+class StampedeTest(TestCase):
+    workers = 8
+
+    def setUp(self):
+        cache.clear()
+        self.computed = []
+
+    def compute(self):
+        self.computed.append(None)
+        time.sleep(0.1)
+        return len(self.computed)
+
+    def stampede(self, **kwargs):
+        """Все потоки просят значение одновременно."""
+        barrier = threading.Barrier(self.workers)
+        results = []
+
+        def worker():
+            barrier.wait()
+            try:
+                results.append(get_or_refresh('key', self.compute, **kwargs))
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker) for _ in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_one_recompute_per_expiry(self):
+        """Пустой кеш, смена версии и истечение срока — по одному
+        пересчету; пока он идет, остальные получают прежнее значение.
+        """
+        self.assertEqual(self.stampede(version=1, timeout=0.3), [1] * 8)
+        self.assertEqual(len(self.computed), 1)
+
+        results = self.stampede(version=2, timeout=0.3)
+        self.assertEqual(len(self.computed), 2)
+        self.assertEqual(sorted(results), [1] * 7 + [2])
+
+        time.sleep(0.3)
+        results = self.stampede(version=2, timeout=0.3)
+        self.assertEqual(len(self.computed), 3)
+        self.assertEqual(sorted(results), [2] * 7 + [3])
+
+    @override_settings(CACHE_XFETCH_BETA=1)
+    def test_early_recompute(self):
+        """XFetch пересчитывает значение до срока."""
+        get_or_refresh('key', self.compute, timeout=1)
+        with mock.patch('core.cache.random.random', return_value=0.0):
+            self.assertEqual(get_or_refresh('key', self.compute, 1), 1)
+        with mock.patch('core.cache.random.random', return_value=1 - 1e-9):
+            self.assertEqual(get_or_refresh('key', self.compute, 1), 2)
+
+    def test_locked_database_serves_stale(self):
+        get_or_refresh('key', lambda: 'old', version=1)
+
+        def locked():
+            raise OperationalError('database is locked')
+
+        self.assertEqual(get_or_refresh('key', locked, version=2), 'old')
+        with self.assertRaises(OperationalError):
+            get_or_refresh('other', locked)
+
+    @override_settings(CACHE_REFRESH_DEADLINE=0.05)
+    def test_slow_database_serves_stale(self):
+        get_or_refresh('key', lambda: 'old', version=1)
+
+        def slow():
+            with connection.cursor() as cursor:
+                cursor.execute(SLOW_QUERY)
+            return 'new'
+
+        start = time.monotonic()
+        self.assertEqual(get_or_refresh('key', slow, version=2), 'old')
+        self.assertLess(time.monotonic() - start, 1)
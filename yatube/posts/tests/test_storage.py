@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TransactionTestCase, override_settings
+
+from ..models import Post
+from ..storage import post_images
+from ..thumbnails import release_unused
+from .test_thumbnails import SMALL_GIF
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@mock.patch('posts.thumbnails.schedule')
+class ContentAddressedStorageTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='uploader')
+
+    def create_post(self, name='small.gif', content=SMALL_GIF):
+        return Post.objects.create(
+            text='Пост',
+            author=self.user,
+            image=SimpleUploadedFile(name, content, 'image/gif'),
+        )
+
+    def test_same_content_stored_once(self, schedule):
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(
+            first.image.name,
+            r'^posts/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.gif$',
+        )
+
+    def test_file_removed_with_last_reference(self, schedule):
+        """Файл живет, пока на него ссылается хоть один пост."""
+        first = self.create_post()
+        second = self.create_post()
+        name = first.image.name
+        first.delete()
+        self.assertTrue(post_images.exists(name))
+        second.delete()
+        self.assertFalse(post_images.exists(name))
+
+    def test_replaced_image_removed(self, schedule):
+        post = self.create_post()
+        old_name = post.image.name
+        post.image = SimpleUploadedFile(
+            'other.gif', SMALL_GIF + b'\x00', 'image/gif'
+        )
+        post.save()
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertFalse(post_images.exists(old_name))
+        self.assertTrue(post_images.exists(post.image.name))
+
+    def test_reupload_pins_file(self, schedule):
+        """Файл, только что загруженный заново, не удаляется, пока пост
+        с ним не зафиксирован.
+        """
+        post = self.create_post()
+        name = post_images.save(
+            'posts/again.gif', SimpleUploadedFile('again.gif', SMALL_GIF)
+        )
+        self.assertEqual(name, post.image.name)
+        post.delete()
+        self.assertTrue(post_images.exists(name))
+        with override_settings(POST_IMAGE_PIN_TIMEOUT=0):
+            self.assertTrue(release_unused(name))
+        self.assertFalse(post_images.exists(name))
+
+    def test_concurrent_identical_uploads(self, schedule):
+        barrier = threading.Barrier(4)
+        names = []
+
+        def upload():
+            barrier.wait()
+            names.append(post_images.save(
+                'posts/same.gif', SimpleUploadedFile('same.gif', SMALL_GIF)
+            ))
+
+        threads = [threading.Thread(target=upload) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(names)), 1)
+        directory = post_images.path(os.path.dirname(names[0]))
+        self.assertEqual(len(os.listdir(directory)), 1)
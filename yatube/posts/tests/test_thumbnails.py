@@ -0,0 +1,146 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import thumbnails
+from ..models import Post
+from ..thumbnails import generate, resolve_thumbnails
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='painter')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        thumbnails._resolved.clear()
+
+    def create_post(self):
+        with mock.patch('posts.thumbnails.schedule') as schedule:
+            post = Post.objects.create(
+                text='Пост с картинкой',
+                author=self.user,
+                image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+            )
+        schedule.assert_called_once_with(post.image.name)
+        return post
+
+    def test_only_new_image_is_scheduled(self):
+        post = self.create_post()
+        with mock.patch('posts.thumbnails.schedule') as schedule:
+            post.text = 'Новый текст'
+            post.save()
+        schedule.assert_not_called()
+
+    def test_placeholder_until_generated(self):
+        """Пока миниатюры нет, страница показывает заглушку."""
+        post = self.create_post()
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        with mock.patch('posts.thumbnails.schedule') as schedule:
+            content = self.client.get(url).content.decode()
+        schedule.assert_called_once_with(post.image.name)
+        self.assertIn('thumbnail-placeholder', content)
+        generate(post.image.name)
+        content = self.client.get(url).content.decode()
+        self.assertNotIn('thumbnail-placeholder', content)
+        self.assertIn('<img class="card-img my-2"', content)
+        self.assertIn('.webp 480w', content)
+        self.assertIn('.jpg 960w', content)
+
+    def test_updated_before_generations_bumped(self):
+        """Страница, построенная сразу после сдвига поколения, видит
+        новую дату изменения поста, а значит и новый фрагмент.
+        """
+        post = self.create_post()
+        seen = []
+
+        def bump(*names):
+            seen.append(Post.objects.get(pk=post.pk).updated)
+
+        with mock.patch('posts.thumbnails.bump_generations', bump):
+            generate(post.image.name)
+        self.assertTrue(seen)
+        self.assertGreater(seen[0], post.updated)
+
+    def test_page_resolved_in_one_lookup(self):
+        names = [self.create_post().image.name for _ in range(3)]
+        for name in names:
+            generate(name)
+        thumbnails._resolved.clear()
+        with mock.patch.object(
+            thumbnails.cache, 'get_many', wraps=thumbnails.cache.get_many
+        ) as get_many:
+            resolved = resolve_thumbnails(names)
+            self.assertEqual(get_many.call_count, 1)
+            self.assertTrue(all(resolved.values()))
+            resolve_thumbnails(names)
+            self.assertEqual(get_many.call_count, 1)
+
+    @override_settings(THUMBNAIL_LRU_SIZE=1)
+    def test_lru_is_bounded(self):
+        names = [self.create_post().image.name for _ in range(2)]
+        for name in names:
+            generate(name)
+        resolve_thumbnails(names)
+        self.assertEqual(len(thumbnails._resolved), 1)
+
+    def test_preview_filled_on_upload(self):
+        """Превью и цвет считаются при загрузке и выводятся в заглушке."""
+        post = self.create_post()
+        self.assertTrue(
+            post.image_preview.startswith('data:image/jpeg;base64,')
+        )
+        self.assertRegex(post.image_color, r'^#[0-9a-f]{6}$')
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        with mock.patch('posts.thumbnails.schedule'):
+            content = self.client.get(url).content.decode()
+        self.assertIn(post.image_preview, content)
+
+    def test_backfill_previews(self):
+        post = self.create_post()
+        Post.objects.filter(pk=post.pk).update(
+            image_preview='', image_color=''
+        )
+        call_command('backfill_previews', stdout=io.StringIO())
+        post.refresh_from_db()
+        self.assertTrue(post.image_preview)
+        self.assertTrue(post.image_color)
+
+    def test_pregenerate_without_workers(self):
+        """При --workers 0 миниатюры создаются без пула потоков."""
+        post = self.create_post()
+        out = io.StringIO()
+        call_command('pregenerate_thumbnails', workers=0, stdout=out)
+        self.assertIn('Готово: 1, с ошибками: 0', out.getvalue())
+        self.assertIsNotNone(
+            resolve_thumbnails([post.image.name])[post.image.name]
+        )
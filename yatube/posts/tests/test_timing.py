@@ -0,0 +1,33 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+class ServerTimingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(TIMING_SAMPLE_RATE=1)
+    def test_header_and_log(self):
+        url = reverse('posts:posts_index')
+        with self.assertLogs('yatube.timing', 'INFO') as logs:
+            response = self.client.get(url)
+            self.client.get(url)
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+        first, second = (json.loads(line.split(':', 2)[2])
+                         for line in logs.output)
+        self.assertEqual(first['view'], 'posts:posts_index')
+        self.assertGreater(first['queries'], 0)
+        self.assertGreater(first['template_ms'], 0)
+        # Промах анонимного кеша страниц и кеша представления.
+        self.assertEqual(first['cache_misses'], 2)
+        self.assertEqual(second['view'], 'posts:posts_index')
+        self.assertEqual(second['cache_hits'], 1)
+
+    @override_settings(TIMING_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        response = self.client.get(reverse('posts:posts_index'))
+        self.assertNotIn('Server-Timing', response)
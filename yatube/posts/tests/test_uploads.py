@@ -0,0 +1,57 @@
+import io
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from ..forms import PostForm
+
+
+def jpeg_with_exif(size=(400, 200), orientation=6):
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    exif[0x010F] = 'Camera'
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'JPEG', exif=exif)
+    return SimpleUploadedFile('photo.jpg', buffer.getvalue(), 'image/jpeg')
+
+
+class UploadPipelineTest(TestCase):
+    def clean(self, upload):
+        form = PostForm(data={'text': 'Текст'}, files={'image': upload})
+        return form, form.is_valid()
+
+    @override_settings(POST_IMAGE_MAX_SIDE=100)
+    def test_reencoded_without_exif(self):
+        """Картинка уменьшена, повернута по EXIF и сохранена без EXIF."""
+        form, valid = self.clean(jpeg_with_exif())
+        self.assertTrue(valid, form.errors)
+        with Image.open(form.cleaned_data['image']) as image:
+            self.assertEqual(image.size, (50, 100))
+            self.assertEqual(len(image.getexif()), 0)
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=1000)
+    def test_huge_image_rejected(self):
+        form, valid = self.clean(jpeg_with_exif())
+        self.assertFalse(valid)
+        self.assertIn('image', form.errors)
+
+    def test_unsupported_format_rejected(self):
+        """TIFF не перекодируется, поэтому не принимается вовсе."""
+        buffer = io.BytesIO()
+        Image.new('RGB', (40, 30)).save(buffer, 'TIFF')
+        form, valid = self.clean(
+            SimpleUploadedFile('photo.tif', buffer.getvalue(), 'image/tiff')
+        )
+        self.assertFalse(valid)
+        self.assertIn('TIFF', form.errors['image'][0])
+
+    @override_settings(POST_IMAGE_MAX_DECODED_PIXELS=1000)
+    def test_png_has_lower_pixel_limit(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (40, 30)).save(buffer, 'PNG')
+        form, valid = self.clean(
+            SimpleUploadedFile('image.png', buffer.getvalue(), 'image/png')
+        )
+        self.assertFalse(valid)
+        self.assertTrue(self.clean(jpeg_with_exif((40, 30)))[1])
@@ -6,7 +6,9 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from ..forms import PostForm
@@ -118,7 +120,7 @@ class PostsContextViewsTest(TestCase):
         self.assertEqual(my_test_object.text, 'Первый тестовый пост')
         self.assertEqual(my_test_object.group, self.post.group)
         self.assertEqual(my_test_object.author, self.user)
-        self.assertIn(self.uploaded.name, my_test_object.image.name)
+        self.assertEqual(my_test_object.image.name, self.post.image.name)
 
     def test_group_list_shows_correct_context(self):
         """Шаблон group_list сформирован с правильным контекстом."""
@@ -130,7 +132,7 @@ class PostsContextViewsTest(TestCase):
         self.assertEqual(my_test_object.text, 'Первый тестовый пост')
         self.assertEqual(my_test_object.group, self.post.group)
         self.assertEqual(my_test_object.author, self.user)
-        self.assertIn(self.uploaded.name, my_test_object.image.name)
+        self.assertEqual(my_test_object.image.name, self.post.image.name)
 
     def test_profile_shows_correct_context(self):
         """Шаблон profile сформирован с правильным контекстом."""
@@ -142,7 +144,7 @@ class PostsContextViewsTest(TestCase):
         self.assertEqual(my_test_object.group, self.post.group)
         self.assertEqual(my_test_object.author, self.user)
         self.assertNotIn(self.another_user, response.context['page_obj'])
-        self.assertIn(self.uploaded.name, my_test_object.image.name)
+        self.assertEqual(my_test_object.image.name, self.post.image.name)
 
     def test_post_detail_shows_correct_context(self):
         """Шаблон post_detail сформирован с правильным контекстом."""
@@ -153,7 +155,7 @@ class PostsContextViewsTest(TestCase):
         self.assertEqual(my_test_object.text, 'Первый тестовый пост')
         self.assertEqual(my_test_object.group, self.post.group)
         self.assertEqual(my_test_object.author, self.user)
-        self.assertIn(self.uploaded.name, my_test_object.image.name)
+        self.assertEqual(my_test_object.image.name, self.post.image.name)
 
     def correct_form_fields(self, response):
         """Поля формы PostForm работают корректно."""
@@ -232,6 +234,55 @@ class PaginationViewsTest(TestCase):
             )
 
 
+class KeysetPaginationViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test user')
+        posts = [
+            Post(text=f'Пост №{post_number}', author=cls.user)
+            for post_number in range(13)
+        ]
+        Post.objects.bulk_create(posts)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_cursor_navigation(self):
+        """Курсоры ведут на соседние страницы без повторов."""
+        url = reverse('posts:posts_index')
+        first_page = self.client.get(url).context['page_obj']
+        cursor = first_page.paginator.next_cursor
+        second_page = self.client.get(url, {'after': cursor}).context[
+            'page_obj'
+        ]
+        self.assertEqual(len(first_page), 10)
+        self.assertEqual(len(second_page), 3)
+        self.assertEqual(second_page.number, 2)
+        self.assertFalse(second_page.has_next())
+        self.assertFalse(set(first_page) & set(second_page))
+        back = self.client.get(
+            url, {'before': second_page.paginator.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back), list(first_page))
+
+    def test_no_count_query(self):
+        """Пагинация не считает записи в таблице."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:posts_index'), {'page': 2})
+        self.assertFalse(
+            any('COUNT' in query['sql'] and 'posts_post' in query['sql']
+                for query in queries.captured_queries)
+        )
+
+    def test_broken_cursor_returns_first_page(self):
+        response = self.client.get(
+            reverse('posts:posts_index'), {'after': 'broken'}
+        )
+        self.assertEqual(response.context['page_obj'].number, 1)
+
+
 class CreatedPostDoesntFallInWrongGroup(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -334,12 +385,44 @@ class CasheTestView(TestCase):
 
     def test_post_is_cached(self):
         """Тестируем работу кеша."""
-        my_new_post, content_with_post = self.post_created_with_first_cashe()
+        my_new_post = Post.objects.create(
+            text='Тестирую кеш',
+            author=self.user,
+            group=self.group,
+        )
+        content_with_post = self.authorized_client.get(
+            reverse('posts:posts_index')
+        ).content
+        Post.objects.filter(pk=my_new_post.pk).update(text='В обход сигналов')
         content_with_cashed_post = self.authorized_client.get(
             reverse('posts:posts_index')
         ).content
         self.assertEqual(content_with_post, content_with_cashed_post)
 
+    def test_post_deleted_generation_bumped(self):
+        """Удаление поста сразу сбрасывает страницу из кеша."""
+        my_new_post, content_with_post = self.post_created_with_first_cashe()
+        content_post_deleted = self.authorized_client.get(
+            reverse('posts:posts_index')
+        ).content
+        self.assertNotIn(my_new_post.text.encode(), content_post_deleted)
+
+    def test_group_change_refreshes_old_group(self):
+        another_group = Group.objects.create(title='Другая', slug='other')
+        post = Post.objects.create(
+            text='Переезжающий пост', author=self.user, group=self.group
+        )
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        self.assertIn(post.text.encode(), self.authorized_client.get(
+            url
+        ).content)
+        post = Post.objects.get(pk=post.pk)
+        post.group = another_group
+        post.save()
+        self.assertNotIn(post.text.encode(), self.authorized_client.get(
+            url
+        ).content)
+
     def test_post_deleted_cache_cleared(self):
         my_new_post, content_with_post = self.post_created_with_first_cashe()
         cache.clear()
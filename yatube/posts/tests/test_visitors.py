@@ -0,0 +1,145 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Visitor, visitor_key
+from ..sketches import BloomFilter, HyperLogLog
+from ..visitors import VisitorBuffer, unique_visitors, visitor_buffer
+
+
+class VisitorBufferTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.buffer = VisitorBuffer(
+            flush_size=100, flush_interval=3600, bloom_capacity=1000,
+            store_rows=True,
+        )
+        # Фильтр прогревается в тестах явно, без фонового потока.
+        self.buffer._warming = mock.Mock()
+
+    def tearDown(self):
+        self.buffer.flush()
+
+    def test_index_does_not_write_visitors(self):
+        """Главная страница не пишет в таблицу посетителей, визит
+        учитывается только скетчем.
+        """
+        visitor_buffer.flush()
+        before = unique_visitors()
+        Client().get(reverse('posts:posts_index'), REMOTE_ADDR='192.0.2.10')
+        visitor_buffer.flush()
+        self.assertFalse(Visitor.objects.exists())
+        self.assertEqual(unique_visitors(), before + 1)
+
+    def test_flush_deduplicates(self):
+        Visitor.objects.create(user='10.0.0.1')
+        self.assertEqual(self.buffer.count(), 0)
+        for ip in ('10.0.0.1', '10.0.0.2', '10.0.0.2', '10.0.0.3'):
+            self.buffer.record(ip)
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(Visitor.objects.count(), 3)
+        cache.clear()
+        self.assertEqual(self.buffer.count(), 3)
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_scope_sketches(self):
+        self.buffer.record('10.0.0.1', scope='group:test')
+        self.buffer.record('10.0.0.2')
+        self.buffer.flush()
+        today = timezone.localdate()
+        self.assertEqual(unique_visitors(today, today), 2)
+        self.assertEqual(unique_visitors(scope='group:test'), 1)
+        self.assertEqual(
+            unique_visitors(today + timedelta(days=1), scope='group:test'), 0
+        )
+
+    def test_rollup_command_prunes_visitors(self):
+        Visitor.objects.bulk_create(
+            Visitor(user=f'10.0.1.{number}', key=visitor_key(
+                f'10.0.1.{number}'
+            )) for number in range(50)
+        )
+        call_command('rollup_visitors', prune=True, stdout=StringIO())
+        self.assertFalse(Visitor.objects.exists())
+        self.assertEqual(unique_visitors(), 50)
+
+    def test_key_is_exact_match(self):
+        """Ключ не путает похожие адреса и нормализует запись."""
+        self.assertNotEqual(visitor_key('1.2.3.4'), visitor_key('11.2.3.45'))
+        self.assertEqual(
+            visitor_key(' 2001:DB8:0:0::1 '), visitor_key('2001:db8::1')
+        )
+        visitor = Visitor.objects.create(user='1.2.3.4')
+        self.assertEqual(visitor.key, visitor_key('1.2.3.4'))
+
+    def test_warm_filter_skips_known_visitors(self):
+        Visitor.objects.create(user='10.0.0.1')
+        self.buffer.warm()
+        self.buffer.record('10.0.0.1')
+        self.buffer.record('10.0.0.2')
+        self.assertEqual(list(self.buffer._pending.values()), ['10.0.0.2'])
+
+    def test_filter_sized_from_table(self):
+        """Фильтр не переполняется на большой таблице посетителей."""
+        Visitor.objects.bulk_create(
+            Visitor(user=f'10.1.{n // 256}.{n % 256}', key=f'key{n}')
+            for n in range(3000)
+        )
+        self.buffer.warm()
+        self.assertGreaterEqual(self.buffer.seen.capacity, 6000)
+        self.assertFalse(self.buffer.seen.full)
+        self.buffer.record('10.0.0.9')
+        self.assertEqual(list(self.buffer._pending.values()), ['10.0.0.9'])
+
+    def test_failed_flush_keeps_batch(self):
+        self.buffer.record('10.0.0.1')
+        with mock.patch.object(
+            Visitor.objects, 'bulk_create',
+            side_effect=OperationalError('database is locked'),
+        ):
+            with self.assertRaises(OperationalError):
+                self.buffer.flush()
+        self.assertEqual(self.buffer.flush(), 1)
+
+    def test_failed_sketch_merge_keeps_sketches(self):
+        self.buffer.record('10.0.0.1')
+        with mock.patch(
+            'posts.visitors.merge_sketch',
+            side_effect=OperationalError('database is locked'),
+        ):
+            with self.assertRaises(OperationalError):
+                self.buffer.flush()
+        self.buffer.record('10.0.0.2')
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(unique_visitors(), 2)
+
+
+class BloomFilterTest(SimpleTestCase):
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        items = [str(number) for number in range(1000)]
+        for item in items:
+            bloom.add(item)
+        self.assertTrue(all(item in bloom for item in items))
+        false_positives = sum(
+            str(number) in bloom for number in range(1000, 11000)
+        )
+        self.assertLess(false_positives, 300)
+
+
+class HyperLogLogTest(SimpleTestCase):
+    def test_estimate_and_merge(self):
+        first, second = HyperLogLog(), HyperLogLog()
+        for number in range(20000):
+            first.add(f'a{number}')
+            second.add(f'b{number}')
+        self.assertAlmostEqual(first.estimate(), 20000, delta=1000)
+        merged = HyperLogLog(first.dump()).merge(second)
+        self.assertAlmostEqual(merged.estimate(), 40000, delta=2000)
@@ -0,0 +1,228 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from sorl.thumbnail import default, delete, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from core.cache import bump_generations
+from .models import Post
+from .storage import post_images
+
+logger = logging.getLogger(__name__)
+
+# Варианты картинки поста: кадр 960x339 в нескольких ширинах, WebP
+# для браузеров, которые его понимают, и JPEG для остальных.
+THUMBNAIL_WIDTHS = (480, 768, 960)
+THUMBNAIL_FORMATS = ('WEBP', 'JPEG')
+THUMBNAIL_SIZES = tuple(
+    (
+        f'{width}x{round(width * 339 / 960)}',
+        {'crop': 'center', 'upscale': True, 'format': image_format},
+    )
+    for image_format in THUMBNAIL_FORMATS
+    for width in THUMBNAIL_WIDTHS
+)
+
+Thumbnail = namedtuple(
+    'Thumbnail', ['url', 'width', 'height', 'webp_srcset', 'jpeg_srcset']
+)
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+_resolved = OrderedDict()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                settings.THUMBNAIL_WORKERS, thread_name_prefix='thumbnails'
+            )
+        return _executor
+
+
+def generate(name):
+    """Создает все размеры миниатюр для картинки name.
+
+    После этого посты с картинкой получают новую дату изменения, а их
+    страницы — новые поколения кеша: заглушка меняется на миниатюру.
+    """
+    from .signals import post_scopes
+
+    images = [
+        get_thumbnail(name, geometry, **options)
+        for geometry, options in THUMBNAIL_SIZES
+    ]
+    cache.set(thumbnail_key(name), make_thumbnail(images), None)
+    posts = list(Post.objects.filter(image=name))
+    # Сначала дата изменения, затем поколения: иначе запрос между ними
+    # сохранил бы под новым поколением страницу со старым фрагментом.
+    Post.objects.filter(pk__in=[post.pk for post in posts]).update(
+        updated=timezone.now()
+    )
+    for post in posts:
+        bump_generations(*post_scopes(post))
+
+
+def _generate(name):
+    try:
+        generate(name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+
+
+def _run(name):
+    try:
+        _generate(name)
+    finally:
+        with _lock:
+            _pending.discard(name)
+        connection.close()
+
+
+def schedule(name):
+    """Ставит генерацию миниатюр в пул после фиксации транзакции:
+    рабочий поток должен видеть сохраненный пост. Без рабочих
+    (THUMBNAIL_WORKERS = 0) миниатюры создаются сразу после фиксации.
+    """
+    def submit():
+        if not settings.THUMBNAIL_WORKERS:
+            _generate(name)
+            return
+        with _lock:
+            if name in _pending:
+                return
+            _pending.add(name)
+        get_executor().submit(_run, name)
+
+    transaction.on_commit(submit)
+
+
+def thumbnail_key(name):
+    return 'thumbnails:' + hashlib.md5(name.encode()).hexdigest()
+
+
+def make_thumbnail(images):
+    """Собирает src и srcset из миниатюр в порядке THUMBNAIL_SIZES."""
+    srcsets = defaultdict(list)
+    for (_, options), image in zip(THUMBNAIL_SIZES, images):
+        srcsets[options['format']].append(f'{image.url} {image.width}w')
+    largest = images[-1]
+    return Thumbnail(
+        largest.url,
+        largest.width,
+        largest.height,
+        ', '.join(srcsets['WEBP']),
+        ', '.join(srcsets['JPEG']),
+    )
+
+
+def _remember(found):
+    with _lock:
+        for key, thumbnail in found.items():
+            _resolved[key] = thumbnail
+            _resolved.move_to_end(key)
+        while len(_resolved) > settings.THUMBNAIL_LRU_SIZE:
+            _resolved.popitem(last=False)
+
+
+def resolve_thumbnails(names):
+    """Готовые миниатюры для набора картинок: {имя: Thumbnail или None}.
+
+    Сначала смотрит ограниченный LRU процесса, затем все остальное
+    одним get_many общего кеша, и только для промахов спрашивает
+    хранилище ключей sorl. Недостающие миниатюры ставятся в очередь.
+    """
+    keys = {name: thumbnail_key(name) for name in set(names) if name}
+    found = {}
+    with _lock:
+        for key in keys.values():
+            if key in _resolved:
+                _resolved.move_to_end(key)
+                found[key] = _resolved[key]
+    missing = [key for key in keys.values() if key not in found]
+    if missing:
+        found.update(cache.get_many(missing))
+    fetched = {}
+    for name, key in keys.items():
+        if key in found:
+            continue
+        images = [
+            default.backend.get_ready_thumbnail(name, geometry, **options)
+            for geometry, options in THUMBNAIL_SIZES
+        ]
+        if None in images:
+            schedule(name)
+        else:
+            fetched[key] = found[key] = make_thumbnail(images)
+    if fetched:
+        cache.set_many(fetched, None)
+    _remember(found)
+    return {name: found.get(key) for name, key in keys.items()}
+
+
+def attach_thumbnails(posts):
+    """Разом находит миниатюры постов страницы и кладет их в
+    post.thumbnail, чтобы шаблон не искал их по одной.
+    """
+    posts = list(posts)
+    resolved = resolve_thumbnails([post.image.name for post in posts])
+    for post in posts:
+        post.thumbnail = resolved.get(post.image.name)
+    return posts
+
+
+def delete_image(name):
+    """Удаляет файл картинки, его миниатюры и их записи в кешах."""
+    delete(ImageFile(name, post_images))
+    key = thumbnail_key(name)
+    cache.delete(key)
+    with _lock:
+        _resolved.pop(key, None)
+
+
+def release_unused(name):
+    """Удаляет картинку, если на нее не ссылается ни один пост и ее не
+    закрепила незафиксированная загрузка. Проверка идет под блокировкой
+    хеша, так что одновременная загрузка того же файла его не потеряет.
+    """
+    with post_images.locked(name):
+        if post_images.pinned(name):
+            return False
+        if Post.objects.filter(image=name).exists():
+            return False
+        delete_image(name)
+        post_images.unpin(name)
+        return True
+
+
+def attach_image(name):
+    """Снимает закрепление загрузки после фиксации поста: дальше файл
+    держит ссылка из базы. Если транзакция откатится, закрепление
+    истечет само через POST_IMAGE_PIN_TIMEOUT.
+    """
+    transaction.on_commit(lambda: post_images.unpin(name))
+
+
+def release_image(name):
+    """Снимает ссылку поста на картинку. Файл с одинаковым содержимым
+    общий для всех постов, поэтому он удаляется только после фиксации
+    транзакции и только если больше ни один пост на него не ссылается.
+    """
+    def cleanup():
+        try:
+            release_unused(name)
+        except Exception:
+            logger.exception('Не удалось удалить картинку %s', name)
+
+    if name:
+        transaction.on_commit(cleanup)
@@ -0,0 +1,153 @@
+import base64
+import io
+import math
+import os
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from PIL import Image, ImageOps
+
+# Форматы, которые перекодируются. GIF сохраняется как есть: EXIF в нем
+# нет, а перекодирование потеряло бы анимацию. Остальные отклоняются.
+REENCODE = {
+    'JPEG': {'quality': 88, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 88},
+}
+FORMATS = {*REENCODE, 'GIF'}
+CHUNK_SIZE = 64 * 1024
+# Превью в пропорциях кадра 960x339.
+PREVIEW_SIZE = (16, 6)
+ORIENTATION = 0x0112
+
+
+class UploadError(ValueError):
+    pass
+
+
+def spill(upload):
+    """Путь к файлу загрузки на диске; файл из памяти пишется кусками."""
+    if hasattr(upload, 'temporary_file_path'):
+        return upload.temporary_file_path(), False
+    handle, path = tempfile.mkstemp(suffix='.upload')
+    with os.fdopen(handle, 'wb') as target:
+        for chunk in upload.chunks(CHUNK_SIZE):
+            target.write(chunk)
+    return path, True
+
+
+def read_header(path, max_pixels, max_decoded_pixels):
+    """Формат и размер из заголовка, без декодирования пикселей.
+
+    JPEG декодируется в уменьшенном масштабе, поэтому ему разрешено
+    max_pixels; остальные форматы декодируются целиком, и для них
+    предел ниже — max_decoded_pixels.
+    """
+    try:
+        with Image.open(path) as image:
+            image_format, size = image.format, image.size
+    except (OSError, Image.DecompressionBombError):
+        raise UploadError('Файл не является изображением.')
+    if image_format not in FORMATS:
+        raise UploadError(
+            f'Формат {image_format} не поддерживается: '
+            'загрузите JPEG, PNG, WebP или GIF.'
+        )
+    limit = max_pixels if image_format == 'JPEG' else max_decoded_pixels
+    if size[0] * size[1] > limit:
+        raise UploadError(
+            f'Изображение {size[0]}x{size[1]} слишком большое: '
+            f'не больше {limit // 1000000} мегапикселей.'
+        )
+    return image_format, size
+
+
+def reencode(source, target, image_format, max_side):
+    """Перекодирует картинку без EXIF, уменьшив до max_side по большей
+    стороне. JPEG декодируется сразу в уменьшенном масштабе (draft),
+    так что полный кадр в память не попадает; поворот по EXIF
+    применяется уже к уменьшенной картинке.
+    """
+    with Image.open(source) as image:
+        ratio = min(1, max_side / max(image.size))
+        if image_format == 'JPEG':
+            image.draft('RGB', (
+                math.ceil(image.width * ratio),
+                math.ceil(image.height * ratio),
+            ))
+        orientation = image.getexif().get(ORIENTATION, 1)
+        image.thumbnail((max_side, max_side), Image.LANCZOS, None)
+        if orientation != 1:
+            image = ImageOps.exif_transpose(image)
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.save(target, image_format, **REENCODE[image_format])
+
+
+def process_upload(upload, max_pixels, max_side, max_decoded_pixels):
+    """Проверяет загрузку и возвращает очищенную копию во временном
+    файле. Исходник читается с диска кусками; большие кадры
+    отклоняются по заголовку до декодирования.
+    """
+    path, spilled = spill(upload)
+    try:
+        image_format, size = read_header(
+            path, max_pixels, max_decoded_pixels
+        )
+        if image_format not in REENCODE and max(size) > max_side:
+            raise UploadError(
+                f'Изображение {size[0]}x{size[1]} слишком большое: '
+                f'не больше {max_side} точек по большей стороне.'
+            )
+        result = TemporaryUploadedFile(
+            upload.name,
+            Image.MIME.get(image_format, upload.content_type),
+            0,
+            None,
+        )
+        if image_format in REENCODE:
+            reencode(path, result.file, image_format, max_side)
+        else:
+            with open(path, 'rb') as source:
+                shutil.copyfileobj(source, result.file, CHUNK_SIZE)
+        result.size = result.file.tell()
+        result.file.seek(0)
+        return result
+    finally:
+        if spilled:
+            os.remove(path)
+
+
+def make_preview(file):
+    """Крошечное превью картинки в data URI и ее основной цвет."""
+    with Image.open(file) as image:
+        image.draft('RGB', (PREVIEW_SIZE[0] * 8, PREVIEW_SIZE[1] * 8))
+        preview = ImageOps.fit(
+            image.convert('RGB'), PREVIEW_SIZE, Image.BOX
+        )
+    counts = preview.quantize(4).convert('RGB').getcolors()
+    color = '#%02x%02x%02x' % max(counts)[1]
+    buffer = io.BytesIO()
+    preview.save(buffer, 'JPEG', quality=60)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/jpeg;base64,{encoded}', color
+
+
+def fill_preview(post):
+    """Заполняет превью и цвет поста по его картинке: загруженной,
+    но еще не сохраненной, или уже лежащей в хранилище.
+    """
+    post.image_preview, post.image_color = '', ''
+    if not post.image:
+        return
+    committed = post.image._committed
+    file = post.image.file
+    try:
+        file.seek(0)
+        post.image_preview, post.image_color = make_preview(file)
+    finally:
+        if committed:
+            post.image.close()
+        else:
+            file.seek(0)
@@ -1,51 +1,81 @@
-from django.contrib.auth.decorators import login_required
+from django.conf import settings
 from django.core.paginator import Paginator
+from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import render, get_object_or_404, redirect
-from django.views.decorators.cache import cache_page
-from django.db.models import Q
 
+from core.cache import cache_versioned_page
+from core.conditional import conditional_on_scopes
+from .counters import get_counters
+from .feed import FeedPaginator
 from .forms import PostForm, CommentForm
-from .models import Post, Group, User, Follow, Visitor
+from .models import Comment, Post, Group, User, Follow
+from .paginators import KeysetPaginator
+from .search import SearchResults
+from .thumbnails import attach_thumbnails
+from .visitors import get_client_ip, visitor_buffer
+
+POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+
+
+def get_page(request, paginator):
+    return paginator.get_page(
+        request.GET.get('page'),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
 
 
 def get_pagination(request, post_list):
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+    return get_page(request, KeysetPaginator(post_list, POSTS_PER_PAGE))
+
+
+def index_scopes(request):
+    return ['feed', 'users', 'groups']
+
+
+def group_scopes(request, group):
+    return [f'group:{group.pk}', 'users']
+
+
+def profile_scopes(request, author):
+    return [f'author:{author.pk}', 'groups']
+
+
+def detail_scopes(request, post):
+    return [f'post:{post.pk}', f'author:{post.author_id}', 'users', 'groups']
 
 
-# @cache_page(20, key_prefix='index_page')
 def index(request):
-    post_list = Post.objects.all()
-    page_obj = get_pagination(request, post_list)
+    visitor_buffer.record(get_client_ip(request))
+    return index_page(request)
 
-    def get_ip(request):
-        address = request.META.get('HTTP_X_FORWARDED_FOR')
-        if address:
-            ip = address.split(',')[-1].strip()
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
-    ip = get_ip(request)
-    user_ip = Visitor(user=ip)
-    result = Visitor.objects.filter(Q(user__icontains=ip))
-    if len(result) >= 1:
-        pass
-    else:
-        user_ip.save()
-    visitors_count = Visitor.objects.all().count()
-    context = {
-        'page_obj': page_obj,
-        'visitors_count': visitors_count,
-    }
-    return render(request, 'posts/index.html', context)
+
+@conditional_on_scopes(index_scopes, holes=['visitors'])
+@cache_versioned_page(index_scopes)
+def index_page(request):
+    post_list = Post.objects.select_related('author', 'group')
+    page_obj = get_pagination(request, post_list)
+    return render(request, 'posts/index.html', {'page_obj': page_obj})
 
 
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts_list = Post.objects.filter(group=group).order_by('-created')
+    if settings.VISITORS_SCOPE_SKETCHES:
+        visitor_buffer.record(get_client_ip(request), scope=f'group:{slug}')
+    return group_page(request, group)
+
+
+@conditional_on_scopes(group_scopes)
+@cache_versioned_page(group_scopes)
+def group_page(request, group):
+    posts_list = Post.objects.filter(group=group).select_related(
+        'author', 'group'
+    )
     page_obj = get_pagination(request, posts_list)
+    attach_thumbnails(page_obj)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -54,39 +84,71 @@ def group_posts(request, slug):
 
 
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('author')
+    author = get_object_or_404(
+        User.objects.select_related('counters'), username=username
+    )
+    if settings.VISITORS_SCOPE_SKETCHES:
+        visitor_buffer.record(
+            get_client_ip(request), scope=f'profile:{username}'
+        )
+    return profile_page(request, author)
+
+
+@conditional_on_scopes(profile_scopes)
+@cache_versioned_page(profile_scopes)
+def profile_page(request, author):
+    post_list = author.posts.select_related('author', 'group')
     page_obj = get_pagination(request, post_list)
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(user=request.user, author=author)
-        followers = Follow.objects.filter(author=author).count
-        context = {
-            'author': author,
-            'page_obj': page_obj,
-            'following': following,
-            'followers': followers,
-        }
-        return render(request, 'posts/profile.html', context)
+    attach_thumbnails(page_obj)
     context = {
         'author': author,
         'page_obj': page_obj,
+        'counters': get_counters(author),
     }
     return render(request, 'posts/profile.html', context)
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__counters', 'group'), id=post_id
+    )
+    return post_page(request, post)
+
+
+@conditional_on_scopes(detail_scopes)
+def post_page(request, post):
     form = CommentForm(request.POST or None)
     context = {
         'post': post,
         'form': form,
-        'comments': comments,
+        'comments': get_comments(request, post.pk),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def get_comments(request, post_id):
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    )
+    return get_page(request, KeysetPaginator(comments, COMMENTS_PER_PAGE))
+
+
+def post_comments(request, post_id):
+    """Следующая порция комментариев для подгрузки на странице поста."""
+    comments = get_comments(request, post_id)
+    # Пустая порция бывает и у несуществующего поста; проверяем его
+    # только в этом случае, чтобы не тратить запрос на каждую порцию.
+    if not comments and not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    context = {
+        'post_id': post_id,
+        'comments': comments,
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
@@ -103,7 +165,7 @@ def post_edit(request, post_id):
     form = PostForm(
         request.POST or None, files=request.FILES or None, instance=post
     )
-    if request.user != post.author:
+    if post.author_id != request.user.pk:
         return redirect('posts:post_detail', post_id)
     if form.is_valid():
         form.save()
@@ -119,6 +181,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -130,13 +193,25 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = Paginator(SearchResults(query), POSTS_PER_PAGE).get_page(
+        request.GET.get('page')
+    )
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def follow_index(request):
-    username = request.user.username
-    author = get_object_or_404(User, username=username)
-    post_list = Post.objects.filter(author__following__user=request.user)
-    following_count = Follow.objects.filter(author__following__user=request.user).count()
-    page_obj = get_pagination(request, post_list)
+    author = request.user
+    following_count = get_counters(author).following_count
+    page_obj = get_page(
+        request, FeedPaginator(request.user, POSTS_PER_PAGE)
+    )
     context = {
         'author': author,
         'username': request.user.username,
@@ -147,18 +222,18 @@ def follow_index(request):
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user and not Follow.objects.filter(
             user=request.user, author=author
-    ):
+    ).exists():
         following = Follow.objects.create(
             user=request.user,
             author=author,
         )
-        post_list = author.posts.select_related('author')
+        post_list = author.posts.select_related('author', 'group')
         page_obj = get_pagination(request, post_list)
-        following = Follow.objects.filter(user=request.user, author=author)
         context = {
             'author': author,
             'username': request.user.username,
@@ -170,6 +245,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
@@ -0,0 +1,217 @@
+import atexit
+import threading
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from core.cache import get_or_refresh
+from .models import Visitor, VisitorSketch, visitor_key
+from .sketches import BloomFilter, HyperLogLog
+
+VISITORS_COUNT_KEY = 'visitors_count'
+
+
+def get_client_ip(request):
+    address = request.META.get('HTTP_X_FORWARDED_FOR')
+    if address:
+        return address.split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR')
+
+
+def merge_sketch(day, scope, sketch):
+    """Добавляет скетч к сохраненному скетчу дня."""
+    with transaction.atomic():
+        stored, created = VisitorSketch.objects.get_or_create(
+            day=day, scope=scope, defaults={'registers': sketch.dump()}
+        )
+        if not created:
+            stored.registers = HyperLogLog(stored.registers).merge(
+                sketch
+            ).dump()
+            stored.save(update_fields=('registers',))
+
+
+def unique_visitors(start=None, end=None, scope=''):
+    """Оценка уникальных посетителей за период по дневным скетчам.
+
+    Скетчи сливаются по одному, так что память не зависит от длины
+    периода.
+    """
+    sketches = VisitorSketch.objects.filter(scope=scope)
+    if start is not None:
+        sketches = sketches.filter(day__gte=start)
+    if end is not None:
+        sketches = sketches.filter(day__lte=end)
+    total = HyperLogLog()
+    for registers in sketches.values_list('registers', flat=True).iterator():
+        total.merge(HyperLogLog(registers))
+    return round(total.estimate())
+
+
+class VisitorBuffer:
+    """Отложенная запись посетителей.
+
+    Каждый визит попадает в скетч HyperLogLog текущего дня, общий и,
+    если задан, раздела; скетчи копятся в памяти процесса и сливаются
+    с сохраненными по таймеру, в фоновом потоке. Число посетителей
+    считается только по скетчам.
+
+    С store_rows адреса еще и пишутся в таблицу Visitor пачкой по
+    достижении порога размера или по таймеру. Фильтр Блума, прогретый
+    ключами из таблицы, отсекает повторные визиты без обращения к
+    базе. Его емкость берется с запасом от размера таблицы, а
+    переполненный фильтр строится заново, иначе ложные «да» молча
+    теряли бы новых посетителей. Несохраненное при ошибке
+    возвращается в буфер, остаток сбрасывается при завершении процесса.
+    """
+
+    def __init__(self, flush_size, flush_interval, bloom_capacity,
+                 store_rows=False):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.bloom_capacity = bloom_capacity
+        self.store_rows = store_rows
+        self.seen = BloomFilter(bloom_capacity)
+        self._warming = None
+        self._pending = {}
+        self._sketches = {}
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def warm(self):
+        """Строит фильтр по ключам уже известных посетителей, емкостью
+        вдвое больше таблицы и не меньше bloom_capacity.
+        """
+        try:
+            seen = BloomFilter(
+                max(self.bloom_capacity, Visitor.objects.count() * 2)
+            )
+            keys = Visitor.objects.values_list('key', flat=True)
+            for key in keys.iterator(chunk_size=10000):
+                seen.add(key)
+        except DatabaseError:
+            return
+        # Ключ, записанный в базу уже после чтения таблицы, в новый
+        # фильтр не попадет; повторный визит проверит flush по базе.
+        with self._lock:
+            for key in self._pending:
+                seen.add(key)
+            self.seen = seen
+
+    def start_warming(self):
+        self._warming = threading.Thread(
+            target=self._warm_in_thread, daemon=True
+        )
+        self._warming.start()
+        return self._warming
+
+    def _warm_in_thread(self):
+        try:
+            self.warm()
+        finally:
+            connection.close()
+
+    def record(self, ip, scope=''):
+        if not ip:
+            return
+        if self.store_rows and (self._warming is None or (
+            self.seen.full and not self._warming.is_alive()
+        )):
+            self.start_warming()
+        key = visitor_key(ip)
+        day = timezone.localdate()
+        with self._lock:
+            for name in {'', scope}:
+                if (day, name) not in self._sketches:
+                    self._sketches[day, name] = HyperLogLog()
+                self._sketches[day, name].add(key)
+            if self.store_rows and key not in self.seen:
+                self.seen.add(key)
+                self._pending[key] = ip
+            full = len(self._pending) >= self.flush_size
+            if not full:
+                self._schedule_flush()
+        if full:
+            threading.Thread(target=self._flush_in_thread, daemon=True).start()
+
+    def _schedule_flush(self):
+        """Запускает таймер сброса; вызывается под блокировкой."""
+        if self._timer is None:
+            self._timer = threading.Timer(
+                self.flush_interval, self._flush_in_thread
+            )
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_in_thread(self):
+        try:
+            self.flush()
+        finally:
+            connection.close()
+
+    def flush(self):
+        """Записывает накопленные адреса, возвращает число новых."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            sketches, self._sketches = self._sketches, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        try:
+            for (day, scope), sketch in sketches.items():
+                merge_sketch(day, scope, sketch)
+            if not batch:
+                return 0
+            known = set(
+                Visitor.objects.filter(key__in=batch).values_list(
+                    'key', flat=True
+                )
+            )
+            new = [
+                Visitor(user=ip, key=key)
+                for key, ip in batch.items() if key not in known
+            ]
+            Visitor.objects.bulk_create(new, ignore_conflicts=True)
+        except Exception:
+            self._restore(batch, sketches)
+            raise
+        return len(new)
+
+    def _restore(self, batch, sketches):
+        """Возвращает пачку в буфер после ошибки сброса: ключи уже в
+        фильтре и без этого потерялись бы. Скетчи, успевшие слиться,
+        сольются повторно без вреда: регистры берутся по максимуму.
+        """
+        with self._lock:
+            self._pending = {**batch, **self._pending}
+            for name, sketch in sketches.items():
+                if name in self._sketches:
+                    sketch.merge(self._sketches[name])
+                self._sketches[name] = sketch
+            self._schedule_flush()
+
+    def flush_at_exit(self):
+        try:
+            self.flush()
+        finally:
+            connection.close()
+
+    def count(self):
+        """Оценка числа посетителей из кеша, без запроса на каждый хит."""
+        return get_or_refresh(
+            VISITORS_COUNT_KEY,
+            unique_visitors,
+            settings.VISITORS_COUNT_TIMEOUT,
+        )
+
+
+visitor_buffer = VisitorBuffer(
+    flush_size=settings.VISITORS_FLUSH_SIZE,
+    flush_interval=settings.VISITORS_FLUSH_INTERVAL,
+    bloom_capacity=settings.VISITORS_BLOOM_CAPACITY,
+    store_rows=settings.VISITORS_STORE_ROWS,
+)
+# В тестах к выходу база уже удалена, а соединение смотрит на рабочую.
+if not settings.TESTING:
+    atexit.register(visitor_buffer.flush_at_exit)
@@ -1,4 +1,8 @@
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 from dotenv import load_dotenv
 
 
@@ -7,6 +11,8 @@ load_dotenv()
 
 SECRET_KEY = os.getenv('SECRET_KEY')
 DEBUG = True
+# Запуск тестов: manage.py test или pytest.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -28,13 +34,16 @@ INSTALLED_APPS = [
     'posts.apps.PostsConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
     'debug_toolbar',
 
 ]
 
 MIDDLEWARE = [
+    'core.timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.pagecache.PageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -112,10 +121,104 @@ LOGIN_REDIRECT_URL = 'posts:posts_index'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+POST_IMAGE_MAX_PIXELS = 50000000
+# PNG, WebP и GIF декодируются без уменьшения: 16 Мп — около 64 МБ RGBA.
+POST_IMAGE_MAX_DECODED_PIXELS = 16000000
+POST_IMAGE_MAX_SIDE = 2400
+# Сколько секунд повторно загруженный файл защищен от удаления: пост с
+# ним за это время успевает зафиксироваться.
+POST_IMAGE_PIN_TIMEOUT = 600
+
+# Тесты получают свой каталог кеша и не трогают кеш запущенного сайта.
+CACHE_DIR = os.getenv('CACHE_DIR')
+if CACHE_DIR is None and TESTING:
+    CACHE_DIR = tempfile.mkdtemp(prefix='yatube-cache-')
+    atexit.register(shutil.rmtree, CACHE_DIR, True)
+elif CACHE_DIR is None:
+    CACHE_DIR = os.path.join(BASE_DIR, 'cache')
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.sqlitecache.SQLiteCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'default.sqlite3'),
+        'OPTIONS': {
+            'MAX_SIZE': 64 * 2 ** 20,
+        },
+    },
+    'fragments': {
+        'BACKEND': 'core.sqlitecache.SQLiteCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'fragments.sqlite3'),
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_SIZE': 32 * 2 ** 20,
+        },
+    },
+}
+
+PAGE_CACHE_TIMEOUT = None
+# Защита от одновременного пересчета: срок блокировки, сколько хранить
+# устаревшее значение после срока, сколько ждать пересчета и базы,
+# параметр раннего пересчета XFetch (0 — только по сроку).
+CACHE_LOCK_TIMEOUT = 30
+CACHE_STALE_TIMEOUT = 600
+CACHE_REFRESH_DEADLINE = 2.0
+CACHE_XFETCH_BETA = 1.0
+
+VISITORS_FLUSH_SIZE = 100
+VISITORS_FLUSH_INTERVAL = 30
+VISITORS_BLOOM_CAPACITY = 1000000
+VISITORS_COUNT_TIMEOUT = 300
+VISITORS_SCOPE_SKETCHES = True
+# Писать ли адреса в таблицу Visitor. Посетителей считают скетчи, так
+# что по умолчанию таблица не растет; накопленное переносит в скетч и
+# удаляет rollup_visitors --prune.
+VISITORS_STORE_ROWS = False
+
+FEED_FANOUT_LIMIT = 1000
+FEED_BACKFILL_LIMIT = 500
+
+# Доля запросов с заголовком Server-Timing и строкой в логе; в тестах
+# лог молчит, чтобы не смешиваться с их выводом.
+TIMING_SAMPLE_RATE = 0 if TESTING else float(
+    os.getenv('TIMING_SAMPLE_RATE', 0.01)
+)
+
+METRICS_DIR = os.getenv('METRICS_DIR')
+if METRICS_DIR is None and TESTING:
+    METRICS_DIR = tempfile.mkdtemp(prefix='yatube-metrics-')
+    atexit.register(shutil.rmtree, METRICS_DIR, True)
+elif METRICS_DIR is None:
+    METRICS_DIR = os.path.join(BASE_DIR, 'metrics')
+
+THUMBNAIL_BACKEND = 'core.thumbnails.ThumbnailBackend'
+# В тестах пула нет: его потоки пережили бы тест и писали бы в
+# MEDIA_ROOT, который тест уже удалил.
+THUMBNAIL_WORKERS = 0 if TESTING else 2
+THUMBNAIL_LRU_SIZE = 2048
+
+# Больше совпадений — выдача по свежести, без ранжирования bm25.
+SEARCH_RANK_LIMIT = 10000
+
+# Дальше этого админка не считает записи точно.
+ADMIN_COUNT_LIMIT = 10000
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'yatube.timing': {
+            'handlers': ['console'],
+            'level': os.getenv('TIMING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
 }
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'